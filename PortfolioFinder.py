@@ -1,7 +1,8 @@
-import sys
+import sys, argparse
 import qasync, asyncio
 from PySide6.QtWidgets import QApplication
 from finder.app import Window
+from finder.Daemon import run_daemon
 
 # Used when starting from generated executable to control splash screen
 try:
@@ -10,7 +11,20 @@ except ImportError:
     pass
 
 if __name__ == "__main__":   
-    app = QApplication(sys.argv)
+    # Diagnostic options - remaining arguments are passed onto Qt
+    parser = argparse.ArgumentParser(description="Portfolio Finder")
+    parser.add_argument('--lag-threshold', type=int, default=200, metavar='MS',
+                        help='report event loop stalls longer than MS milliseconds (default: 200)')
+    parser.add_argument('--profile', type=int, metavar='SECONDS',
+                        help='profile the UI thread for the first SECONDS seconds; also the duration used by Ctrl+Shift+P')
+    parser.add_argument('--daemon', action='store_true',
+                        help='run the local catalog daemon, sharing one session and cache with every PortfolioFinder')
+    args, qt_args = parser.parse_known_args()
+
+    if args.daemon:
+        sys.exit(run_daemon())
+
+    app = QApplication(sys.argv[:1] + qt_args)
 
 	# Kill the splash screen (start via pyinstaller)
     try:
@@ -27,6 +41,11 @@ if __name__ == "__main__":
     window = Window(loop)   
     window.show()
 
+    window.monitor.threshold = args.lag_threshold
+    if args.profile:
+        window.profileSeconds = args.profile
+        window.startProfiler(args.profile)
+
     # Populate the display with the users portfolios (default)
     window.initialize()
 
@@ -0,0 +1,151 @@
+#=============================================================================
+#   This source code is provided under the Apache 2.0 license
+#   and is provided AS IS with no warranty or guarantee of fit for purpose.
+#   Copyright (C) 2024 LSEG. All rights reserved.
+#=============================================================================
+
+# Micro-benchmarks of the results model (DataFrameModel) and header (FilterHeaderView) under the
+# offscreen Qt platform.  Results are written as JSON and checked against the stored thresholds -
+# the run fails (exit code 1) if any measurement regressed beyond its threshold.
+#
+#   > python benchmarks/bench_model.py [--rows 10000 100000 1000000] [--output results.json]
+#                                      [--thresholds thresholds.json] [--update-thresholds]
+
+import os, sys, time, json, random, argparse, platform
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)      # Assets are loaded relative to the application directory
+
+import pandas as pd
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import Qt
+
+from finder.Frames import DataFrame
+from finder.TreeComponents import DataFrameModel, PortfolioTreeView, FilterHeaderView
+from finder.PAM import PAM, project
+from finder import Columnar
+from synthetic import portfolioHeaders
+
+# Measurements where a larger value is better - all others are durations (secs) or sizes
+HIGHER_IS_BETTER = {'data_calls_per_sec'}
+
+# Headroom applied to measurements when updating the thresholds, durations are given a floor
+# to absorb timer noise
+HEADROOM = 2.0
+MIN_SECS = 0.005
+
+def timed(function, repeat=1):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def benchmark(rows, app):
+    headers = portfolioHeaders(rows)
+    signal = DataFrame.DataChanged()
+    results = {}
+
+    # Model construction (including the decode time projection of the headers, as PAM does)
+    model = None
+    def construct():
+        nonlocal model
+        model = DataFrameModel(pd.DataFrame(project(headers, PAM.FIELDS, PAM.EXCLUDED)), signal)
+    results['construct_secs'] = timed(construct)
+    del headers
+
+    # data() throughput over random cells
+    rnd = random.Random(1)
+    cells = [model.index(rnd.randrange(model.rowCount()), rnd.randrange(model.columnCount())) for i in range(20000)]
+    elapsed = timed(lambda: [model.data(index, Qt.DisplayRole) for index in cells], repeat=3)
+    results['data_calls_per_sec'] = len(cells) / elapsed
+
+    # Sorting - a text and a numeric column
+    model.sorting = True
+    name = model.columns.index('name')
+    constituents = model.columns.index('# constituents')
+    results['sort_text_secs'] = timed(lambda: model.sort(name, Qt.AscendingOrder), repeat=3)
+    results['sort_numeric_secs'] = timed(lambda: model.sort(constituents, Qt.DescendingOrder), repeat=3)
+
+    # Family filter - applied and cleared
+    results['apply_filter_secs'] = timed(lambda: (model.apply_filter('Equity'), model.apply_filter(None)), repeat=3)
+
+    # Header repaint
+    tree = PortfolioTreeView()
+    header = FilterHeaderView()
+    tree.setModel(model)
+    tree.setHeader(header)
+    tree.setHighThroughput(True)
+    tree.resize(1100, 600)
+    tree.show()
+    app.processEvents()
+    results['header_repaint_secs'] = timed(lambda: [header.viewport().repaint() for i in range(50)], repeat=3) / 50
+    tree.close()
+
+    # Memory held per row
+    usage = Columnar.memory_usage(model.master_df).sum() + model.order.nbytes + model.rows.nbytes
+    results['bytes_per_row'] = usage / rows
+    return results
+
+# Compare the results against the thresholds, returning the list of regressions
+def check(results, thresholds):
+    regressions = []
+    for rows, measurements in results.items():
+        for metric, value in measurements.items():
+            limit = thresholds.get(rows, {}).get(metric)
+            if limit is None:
+                continue
+            if (value < limit) if metric in HIGHER_IS_BETTER else (value > limit):
+                regressions.append(f'{rows} rows: {metric} = {value:.6g} (threshold: {limit:.6g})')
+    return regressions
+
+def threshold(metric, value):
+    if metric in HIGHER_IS_BETTER:
+        return float(f'{value / HEADROOM:.3g}')
+    if metric.endswith('_secs'):
+        return float(f'{max(value * HEADROOM, MIN_SECS):.3g}')
+    return float(f'{value * HEADROOM:.3g}')
+
+def main():
+    parser = argparse.ArgumentParser(description='DataFrameModel micro-benchmarks')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--output', default=os.path.join(HERE, 'results.json'))
+    parser.add_argument('--thresholds', default=os.path.join(HERE, 'thresholds.json'))
+    parser.add_argument('--update-thresholds', action='store_true',
+                        help=f'store the measurements, with {HEADROOM}x headroom, as the new thresholds')
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    results = {}
+    for rows in args.rows:
+        results[str(rows)] = benchmark(rows, app)
+        print(f'{rows:>9,} rows: ' + ", ".join(f'{metric} {value:.6g}' for metric, value in results[str(rows)].items()))
+
+    with open(args.output, 'w') as file:
+        json.dump({'python': platform.python_version(), 'pandas': pd.__version__, 'results': results}, file, indent=2)
+
+    thresholds = {}
+    if os.path.exists(args.thresholds):
+        with open(args.thresholds) as file:
+            thresholds = json.load(file)
+
+    if args.update_thresholds:
+        for rows, measurements in results.items():
+            thresholds[rows] = {metric: threshold(metric, value) for metric, value in measurements.items()}
+        with open(args.thresholds, 'w') as file:
+            json.dump(thresholds, file, indent=2)
+        return 0
+
+    regressions = check(results, thresholds)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
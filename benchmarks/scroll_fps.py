@@ -0,0 +1,62 @@
+#=============================================================================
+#   This source code is provided under the Apache 2.0 license
+#   and is provided AS IS with no warranty or guarantee of fit for purpose.
+#   Copyright (C) 2024 LSEG. All rights reserved.
+#=============================================================================
+
+# Measures the scrolling frame rate of the results grid under the offscreen Qt platform for the
+# standard and high-throughput rendering modes.
+#
+#   > python benchmarks/scroll_fps.py [--rows 100000 1000000] [--frames 300]
+
+import os, sys, time, argparse
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)      # Assets are loaded relative to the application directory
+
+import pandas as pd
+from PySide6.QtWidgets import QApplication
+
+from finder.Frames import DataFrame
+from finder.PAM import PAM, project
+from synthetic import portfolioHeaders
+
+def scroll_fps(app, headers, highThroughput, frames):
+    frame = DataFrame()
+    frame.resize(1100, 600)
+    frame.show()
+    frame.displayPortfolios(pd.DataFrame(project(headers, PAM.FIELDS, PAM.EXCLUDED)))
+    frame.tree.setHighThroughput(highThroughput)
+    app.processEvents()
+
+    # Scroll a few rows at a time, as a mouse wheel would, forcing a synchronous repaint each step
+    scrollbar = frame.tree.verticalScrollBar()
+    step = max(1, scrollbar.singleStep() * 3)
+    start = time.perf_counter()
+    for i in range(frames):
+        scrollbar.setValue((i * step) % max(1, scrollbar.maximum()))
+        frame.repaint()
+    elapsed = time.perf_counter() - start
+
+    frame.close()
+    frame.deleteLater()
+    app.processEvents()
+    return frames / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Scroll-FPS benchmark of the results grid')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    for rows in args.rows:
+        headers = portfolioHeaders(rows)
+        standard = scroll_fps(app, headers, False, args.frames)
+        fast = scroll_fps(app, headers, True, args.frames)
+        print(f'{rows:>9,} rows: standard {standard:8.1f} fps, high-throughput {fast:8.1f} fps')
+
+if __name__ == "__main__":
+    main()
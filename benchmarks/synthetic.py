@@ -0,0 +1,39 @@
+#=============================================================================
+#   This source code is provided under the Apache 2.0 license
+#   and is provided AS IS with no warranty or guarantee of fit for purpose.
+#   Copyright (C) 2024 LSEG. All rights reserved.
+#=============================================================================
+
+import random
+
+FAMILIES = ['Equity', 'Fixed Income', 'Commodity', 'Multi Asset', 'Real Estate', 'Currency', 'Volatility', '']
+ORGANIZATIONS = ['MSCI', 'FTSE', 'SPDJI', 'STOXX', 'NASDAQ', 'LSEG', 'BLOOMBERG', 'SOLACTIVE']
+WORDS = ['World', 'Emerging', 'Markets', 'Europe', 'Asia', 'Pacific', 'Growth', 'Value', 'Small', 'Mid',
+         'Large', 'Cap', 'ESG', 'Leaders', 'Dividend', 'Momentum', 'Quality', 'Climate', 'Select', 'Total']
+
+# portfolioHeaders
+# Generate a list of synthetic 'portfolioHeaders' resembling the response of the Portfolio Search API.
+def portfolioHeaders(rows, seed=1):
+    rnd = random.Random(seed)
+    headers = []
+    for i in range(rows):
+        org = rnd.choice(ORGANIZATIONS)
+        name = " ".join([org] + rnd.sample(WORDS, rnd.randint(2, 5)))
+        created = f'20{rnd.randint(10, 25):02d}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T10:00:00Z'
+        modified = f'20{rnd.randint(20, 25):02d}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T{rnd.randint(0, 23):02d}:30:00Z'
+        headers.append({
+            'portfolioId': rnd.randint(1, 999999999),
+            'name': name,
+            'code': f'.{org[:3]}{i:07d}',
+            'type': 'MarketIndex',
+            'numberOfConstituents': rnd.randint(1, 5000),
+            'description': '',
+            'ownerId': '',
+            'organizationCode': org,
+            'realm': org,
+            'createdDateTime': created,
+            'lastModifiedDateTime': modified,
+            'accessibility': 'Public',
+            'extendedProperties': {'family': rnd.choice(FAMILIES), 'region': rnd.choice(WORDS)},
+        })
+    return headers
@@ -0,0 +1,53 @@
+#=============================================================================
+#   This source code is provided under the Apache 2.0 license
+#   and is provided AS IS with no warranty or guarantee of fit for purpose.
+#   Copyright (C) 2024 LSEG. All rights reserved.
+#=============================================================================
+
+import pandas as pd
+
+# Arrow-backed strings are used when 'pyarrow' is available, otherwise strings remain Python objects
+try:
+    import pyarrow
+    STRING_DTYPE = pd.StringDtype('pyarrow')
+except ImportError:
+    STRING_DTYPE = None
+
+# Text columns whose number of distinct values is at most this fraction of the rows are
+# stored as categoricals (e.g. 'family', 'org code')
+CATEGORY_RATIO = 0.2
+
+# compact
+# Convert the text columns of the data frame into a compact columnar form - categoricals for
+# repetitive columns and Arrow strings for the others.  Columns holding anything other than
+# text (e.g. nested properties) are left untouched.  The optional 'progress' function is called
+# with the number of columns completed.
+def compact(df, progress=None):
+    for completed, column in enumerate(df.columns, 1):
+        series = df[column]
+        if pd.api.types.is_string_dtype(series.dtype) and is_text(series):
+            if series.nunique(dropna=False) <= len(series) * CATEGORY_RATIO:
+                df[column] = series.astype('category')
+            elif STRING_DTYPE is not None:
+                df[column] = series.astype(STRING_DTYPE)
+
+        if progress is not None:
+            progress(completed)
+    return df
+
+def is_text(series):
+    sample = series.dropna().head(100)
+    return len(sample) > 0 and all(isinstance(value, str) for value in sample)
+
+# memory_usage
+# Returns the number of bytes held by each column, largest first
+def memory_usage(df):
+    usage = df.memory_usage(deep=True, index=False)
+    return usage.sort_values(ascending=False)
+
+# Convert a byte count into a short, human readable value
+def format_bytes(count):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if count < 1024 or unit == 'GB':
+            return f'{count:.0f} {unit}' if unit == 'B' else f'{count:.1f} {unit}'
+        count /= 1024
@@ -0,0 +1,286 @@
+#=============================================================================
+#   This source code is provided under the Apache 2.0 license
+#   and is provided AS IS with no warranty or guarantee of fit for purpose.
+#   Copyright (C) 2024 LSEG. All rights reserved.
+#=============================================================================
+
+# Optional local catalog daemon.  A single daemon owns the platform session and a cache of
+# search results, serving any number of PortfolioFinder instances over a Unix domain socket:
+#
+#   > python PortfolioFinder.py --daemon
+#
+# Messages, in both directions, are JSON documents prefixed by their length (4 bytes, big endian).
+#   request:  {"op": "search", "types": [...], "query": "...", "maxCount": 1000, "priority": 0}
+#             {"op": "ping"}
+#   response: {"ok": true, "columns": {"code": [...], ...}} or {"ok": false, "error": "..."}
+#             {"ok": true, "healthy": false} - a ping while the daemon's session is not open
+#
+# The socket lives in a directory private to the user (XDG_RUNTIME_DIR, otherwise a 0700
+# directory within the temp directory).  Clients only trust a socket, and the process serving
+# it, owned by the same user.
+#
+# Search results are sent as the columns projected by PAM (see PAM.project), omitting the header
+# fields never presented and the field names repeated by every row.
+
+import asyncio, json, os, socket, stat, struct, tempfile, time
+from collections import OrderedDict
+import refinitiv.data as rd
+
+UID = getattr(os, 'getuid', lambda: 0)()
+
+# Location of the socket - may be overridden using the PORTFOLIOFINDER_SOCKET environment variable
+SOCKET_DIRECTORY = os.environ.get('XDG_RUNTIME_DIR') or os.path.join(tempfile.gettempdir(), f'portfoliofinder-{UID}')
+SOCKET_PATH = os.environ.get('PORTFOLIOFINDER_SOCKET', os.path.join(SOCKET_DIRECTORY, 'portfoliofinder.sock'))
+
+# Unix domain sockets are not available on every platform (i.e. Windows event loops)
+SUPPORTED = hasattr(socket, 'AF_UNIX') and hasattr(asyncio, 'start_unix_server')
+
+HEADER = struct.Struct('>I')
+CHUNK_SIZE = 1 << 20
+
+class DaemonUnavailable(ConnectionError):
+    pass
+
+# Ensure only we can create (or replace) entries within the directory - returns the reason if not
+def untrusted_directory(path):
+    try:
+        info = os.lstat(path)
+    except OSError as e:
+        return str(e)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != UID or info.st_mode & 0o022:
+        return f"{path} is not a directory private to this user"
+    return None
+
+# Ensure the socket is owned by us, within a directory only we can write to
+def untrusted_socket(path):
+    reason = untrusted_directory(os.path.dirname(os.path.abspath(path)))
+    if reason is not None:
+        return reason
+    try:
+        info = os.lstat(path)
+    except OSError as e:
+        return str(e)
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != UID:
+        return f"{path} is not a socket owned by this user"
+    return None
+
+# The user id of the process at the other end of the connection, where the platform reports it
+def peer_uid(writer):
+    sock = writer.get_extra_info('socket')
+    if sock is None or not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    return struct.unpack('3i', credentials)[1]
+
+async def send(writer, message):
+    payload = message if isinstance(message, bytes) else json.dumps(message).encode()
+    writer.write(HEADER.pack(len(payload)) + payload)
+    await writer.drain()
+
+# Receive a message, optionally reporting the bytes received to the progress object
+async def receive(reader, progress=None):
+    size = HEADER.unpack(await reader.readexactly(HEADER.size))[0]
+    chunks = []
+    received = 0
+    while received < size:
+        chunk = await reader.readexactly(min(CHUNK_SIZE, size - received))
+        chunks.append(chunk)
+        received += len(chunk)
+        if progress is not None:
+            progress.setBytes(received, size)
+    return json.loads(b"".join(chunks))
+
+# ----------------------------
+# DaemonClient
+# Used by PAM to search via the daemon.  Raises DaemonUnavailable when the daemon is not running.
+class DaemonClient():
+# ----------------------------
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+
+    async def request(self, message, progress=None):
+        if not SUPPORTED:
+            raise DaemonUnavailable("Not supported on this platform")
+        reason = untrusted_socket(self.path)
+        if reason is not None:
+            raise DaemonUnavailable(reason)
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.path, limit=CHUNK_SIZE)
+        except OSError as e:
+            raise DaemonUnavailable(str(e)) from None
+
+        try:
+            uid = peer_uid(writer)
+            if uid is not None and uid != UID:
+                raise DaemonUnavailable(f"{self.path} is served by another user")
+            await send(writer, message)
+            response = await receive(reader, progress)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            raise DaemonUnavailable(str(e)) from None
+        finally:
+            writer.close()
+
+        if response.get('unavailable'):
+            raise DaemonUnavailable(response.get('error', 'Daemon unavailable'))
+        if not response.get('ok'):
+            raise RuntimeError(response.get('error', 'Request failed'))
+        return response
+
+    # Whether a daemon is answering (None when not) and able to serve searches
+    async def status(self):
+        try:
+            return (await self.request({'op': 'ping'})).get('healthy', True)
+        except (DaemonUnavailable, RuntimeError):
+            return None
+
+    async def ping(self):
+        return await self.status() is True
+
+    async def search(self, types, query, maxCount, priority, progress=None):
+        response = await self.request({'op': 'search', 'types': types, 'query': query,
+                                       'maxCount': maxCount, 'priority': priority}, progress)
+        return response['columns']
+
+# ----------------------------
+# CatalogDaemon
+# Serves searches from its cache, requesting the platform (see PAM) only on a miss.  Identical
+# searches received while a request is outstanding share that request.  Cached responses are
+# held encoded, ready to be sent.  The cache is bounded - expired responses are dropped and the
+# least recently used evicted beyond MAX_ENTRIES or MAX_BYTES.
+class CatalogDaemon():
+# ----------------------------
+    TTL = 900                   # secs a search result is served from the cache
+    MAX_ENTRIES = 32            # cached searches
+    MAX_BYTES = 256 << 20       # encoded bytes cached, in total
+
+    def __init__(self, path=SOCKET_PATH):
+        from .PAM import PAM
+        self.path = path
+        self.pam = PAM(None, daemon=False)
+        self.session = None
+        self.err = None
+        self.cache = OrderedDict()      # key -> (time cached, payload), least recently used first
+        self.cacheBytes = 0
+        self.pending = {}
+
+    def check_event(self, event, message, session):
+        if event == rd.session.EventCode.SessionAuthenticationFailed:
+            self.err = f"Session authentication failed: {message}"
+
+    def open_session(self):
+        self.session = rd.session.Definition().get_session()
+        self.session.on_event(self.check_event)
+        self.session.open()
+        rd.session.set_default(self.session)
+
+    # Searches are only served while the session is open - clients otherwise connect themselves
+    def healthy(self):
+        return self.err is None and self.session is not None and self.session.open_state == rd.OpenState.Opened
+
+    async def serve(self):
+        if not SUPPORTED:
+            raise RuntimeError("The daemon requires Unix domain socket support")
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        reason = untrusted_directory(directory)
+        if reason is not None:
+            raise RuntimeError(f"Unable to serve {self.path}: {reason}")
+
+        # Only one daemon at a time - a left over socket file is removed
+        if await DaemonClient(self.path).status() is not None:
+            raise RuntimeError(f"A daemon is already serving {self.path}")
+        if os.path.lexists(self.path):
+            os.unlink(self.path)
+
+        # Refuse to serve without an open session
+        await asyncio.get_event_loop().run_in_executor(None, self.open_session)
+        if not self.healthy():
+            self.session.close()
+            raise RuntimeError(self.err or "Unable to open a session")
+        server = await asyncio.start_unix_server(self.handle, self.path, limit=CHUNK_SIZE)
+        os.chmod(self.path, 0o600)
+        print(f'PortfolioFinder daemon serving: {self.path}')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.session.close()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    message = await receive(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                await send(writer, await self.process(message))
+        except OSError:
+            pass
+        finally:
+            writer.close()
+
+    async def process(self, message):
+        try:
+            if message.get('op') == 'ping':
+                return {'ok': True, 'healthy': self.healthy()}
+            if message.get('op') == 'search':
+                if not self.healthy():
+                    return {'ok': False, 'unavailable': True, 'error': self.err or "The daemon's session is not open"}
+                return await self.search(message.get('types'), message.get('query'),
+                                         message.get('maxCount'), message.get('priority', 0))
+            return {'ok': False, 'error': f"Unknown operation: {message.get('op')}"}
+        except Exception as e:
+            return {'ok': False, 'error': str(e)}
+
+    async def search(self, types, query, maxCount, priority):
+        key = (tuple(types) if types else None, query, maxCount)
+        cached = self.cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.TTL:
+            self.cache.move_to_end(key)
+            return cached[1]
+
+        if key not in self.pending:
+            self.pending[key] = asyncio.ensure_future(self.fetch(key, types, query, maxCount, priority))
+        return await asyncio.shield(self.pending[key])
+
+    async def fetch(self, key, types, query, maxCount, priority):
+        try:
+            columns = await self.pam.requestColumns(types, query, maxCount, priority=priority)
+            payload = json.dumps({'ok': True, 'columns': columns}).encode()
+            self.store(key, payload)
+            return payload
+        finally:
+            del self.pending[key]
+
+    def store(self, key, payload):
+        self.discard(key)
+        now = time.monotonic()
+        for expired in [cachedKey for cachedKey, (cached, _) in self.cache.items() if now - cached >= self.TTL]:
+            self.discard(expired)
+
+        # A response larger than the whole cache is served, but not kept
+        if len(payload) > self.MAX_BYTES:
+            return
+        while self.cache and (len(self.cache) >= self.MAX_ENTRIES or self.cacheBytes + len(payload) > self.MAX_BYTES):
+            self.discard(next(iter(self.cache)))
+
+        self.cache[key] = (now, payload)
+        self.cacheBytes += len(payload)
+
+    def discard(self, key):
+        entry = self.cache.pop(key, None)
+        if entry is not None:
+            self.cacheBytes -= len(entry[1])
+
+def run_daemon():
+    try:
+        asyncio.run(CatalogDaemon().serve())
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(e)
+        return 1
+    return 0
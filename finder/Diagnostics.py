@@ -0,0 +1,154 @@
+#=============================================================================
+#   This source code is provided under the Apache 2.0 license
+#   and is provided AS IS with no warranty or guarantee of fit for purpose.
+#   Copyright (C) 2024 LSEG. All rights reserved.
+#=============================================================================
+
+# Diagnostics for UI freezes.  Both Qt and asyncio (qasync) run on the main thread, so any
+# synchronous work there stalls the UI as well as networking.  The watchers below run in
+# their own threads and inspect the stack of the main thread while it is busy.
+
+import os, sys, time, threading
+from collections import deque, Counter
+
+# Location of our application code
+PACKAGE = os.path.dirname(os.path.abspath(__file__))
+
+# The (filename, line, function) of a frame (innermost) and its callers, outermost first
+def stack_of(frame):
+    stack = []
+    while frame is not None:
+        stack.append((frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name))
+        frame = frame.f_back
+    return stack[::-1]
+
+def describe(entry):
+    filename, line, function = entry
+    return f'{function} ({os.path.basename(filename)}:{line})'
+
+def main_frame():
+    return sys._current_frames().get(threading.main_thread().ident)
+
+# ----------------------------
+# LoopLagMonitor
+# Detects stalls of the main (event loop) thread.  The loop updates a heartbeat at a regular
+# interval; when the heartbeat is late by more than the threshold, the stack of the main
+# thread is captured.  The frames nearest the loop identify the coroutine or Qt slot that was
+# running.  Stalls are reported to the console and appended to a log file (next to the
+# profiles of the SamplingProfiler) - the packaged application has no console.  The optional
+# 'on_stall' function is called, from the watcher thread, with each stall and the log path.
+class LoopLagMonitor():
+# ----------------------------
+    PATH = 'portfoliofinder-stalls.log'
+
+    def __init__(self, loop, threshold=200, interval=50, history=100, path=None, on_stall=None):
+        self.loop = loop
+        self.threshold = threshold      # ms
+        self.interval = interval / 1000
+        self.path = path or self.PATH
+        self.on_stall = on_stall
+        self.stalls = deque(maxlen=history)
+        self.heartbeat = time.monotonic()
+        self.running = False
+
+    def start(self):
+        if self.running:
+            return
+
+        self.running = True
+        self.heartbeat = time.monotonic()
+        self.loop.call_soon(self.beat)
+        threading.Thread(target=self.watch, name='LoopLagMonitor', daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    # Runs on the event loop
+    def beat(self):
+        self.heartbeat = time.monotonic()
+        if self.running:
+            self.loop.call_later(self.interval, self.beat)
+
+    # Runs within the watcher thread
+    def watch(self):
+        stall = None
+        while self.running:
+            time.sleep(self.interval)
+            lag = time.monotonic() - self.heartbeat - self.interval
+
+            if lag * 1000 > self.threshold:
+                # Capture the stack once per stall, as soon as it is detected
+                if stall is None:
+                    frame = main_frame()
+                    stall = {'time': time.time(), 'stack': stack_of(frame) if frame is not None else []}
+                stall['duration'] = lag
+            elif stall is not None:
+                self.record(stall)
+                stall = None
+
+    def record(self, stall):
+        stall['culprit'] = self.culprit(stall['stack'])
+        self.stalls.append(stall)
+        print(f'Event loop stalled for {int(stall["duration"] * 1000)} ms in: {stall["culprit"]}')
+        for entry in stall['stack'][-8:]:
+            print(f'    {describe(entry)}')
+
+        try:
+            with open(self.path, 'a') as file:
+                when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stall['time']))
+                file.write(f'{when} stalled for {int(stall["duration"] * 1000)} ms in: {stall["culprit"]}\n')
+                for entry in stall['stack']:
+                    file.write(f'    {describe(entry)}\n')
+        except OSError as e:
+            print(f'Unable to write the stall to {self.path}: {e}')
+            return
+
+        if self.on_stall is not None:
+            self.on_stall(stall, self.path)
+
+    # The outermost application frame of the stack - the coroutine or slot invoked by the loop
+    @staticmethod
+    def culprit(stack):
+        for entry in stack:
+            if entry[0].startswith(PACKAGE):
+                return describe(entry)
+        return describe(stack[-1]) if stack else 'unknown'
+
+# ----------------------------
+# SamplingProfiler
+# Samples the stack of the main thread for the specified number of seconds and writes the
+# samples in the collapsed (folded) stack format - one 'frame;frame;frame count' line per
+# distinct stack - accepted by flamegraph.pl and speedscope.
+class SamplingProfiler():
+# ----------------------------
+    def __init__(self, seconds, interval=5, path=None, on_done=None):
+        self.seconds = seconds
+        self.interval = interval / 1000         # ms -> secs
+        self.path = path or time.strftime('portfoliofinder-%Y%m%d-%H%M%S.folded')
+        self.on_done = on_done
+        self.samples = Counter()
+        self.thread = None
+
+    def isRunning(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='SamplingProfiler', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        end = time.monotonic() + self.seconds
+        while time.monotonic() < end:
+            frame = main_frame()
+            if frame is not None:
+                # Line numbers would split the samples of a function across many stacks
+                stack = [f'{function} ({os.path.basename(filename)})' for filename, line, function in stack_of(frame)]
+                self.samples[";".join(stack)] += 1
+            time.sleep(self.interval)
+
+        with open(self.path, 'w') as file:
+            for stack, count in self.samples.most_common():
+                file.write(f'{stack} {count}\n')
+
+        if self.on_done is not None:
+            self.on_done(self.path, sum(self.samples.values()))
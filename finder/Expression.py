@@ -0,0 +1,343 @@
+#=============================================================================
+#   This source code is provided under the Apache 2.0 license
+#   and is provided AS IS with no warranty or guarantee of fit for purpose.
+#   Copyright (C) 2024 LSEG. All rights reserved.
+#=============================================================================
+
+# Search expressions used to refine the loaded results, for example:
+#
+#   name:~"msci" AND family:Equity AND constituents>500 AND modified>2025-01-01
+#
+#   field:value     equals value (text is case-insensitive)
+#   field:~value    contains value (case-insensitive)
+#   field=value, field!=value, field>value, field>=value, field<value, field<=value
+#   value           'name' or 'code' contains value
+#
+# Terms are combined using AND, OR, NOT and parentheses - adjacent terms imply AND.  Dates
+# without a time compare against the whole day.  An expression is compiled once against the
+# columns of the loaded data into a tree of vectorized column predicates; evaluating the tree
+# returns a boolean mask over all rows.
+
+import re
+import numpy as np
+import pandas as pd
+
+# Text and dates are scanned as Arrow buffers when 'pyarrow' is available, otherwise via pandas
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Friendly field names for the columns presented within the grid
+ALIASES = {
+    'constituents': '# constituents',
+    'org': 'org code',
+    'organization': 'org code',
+    'modified': 'modified date',
+    'created': 'create date',
+    'type': 'type',
+}
+
+# Fields searched by a bare value
+DEFAULT_FIELDS = ['name', 'code']
+
+TOKENS = re.compile(r'\s*(?:(?P<string>"(?:[^"\\]|\\.)*")|(?P<op>:~|!=|>=|<=|[:=<>()])|(?P<word>[^\s:=!<>()"]+))')
+DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+class ExpressionError(ValueError):
+    pass
+
+# compile_expression
+# Compile the expression against the columns of the specified data frame.  Raises an
+# ExpressionError if the expression is invalid.
+def compile_expression(text, df):
+    parser = Parser(tokenize(text), df)
+    node = parser.parse_or()
+    if parser.peek() is not None:
+        raise ExpressionError(f'Unexpected "{parser.peek()[1]}"')
+    return Expression(text, node)
+
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKENS.match(text, position)
+        if match is None or match.end() == position:
+            raise ExpressionError(f'Invalid expression near: {text[position:]}')
+        position = match.end()
+        if match.group('string') is not None:
+            tokens.append(('value', re.sub(r'\\(.)', r'\1', match.group('string')[1:-1])))
+        elif match.group('op') is not None:
+            tokens.append(('op', match.group('op')))
+        else:
+            word = match.group('word')
+            tokens.append(('keyword', word.upper()) if word.upper() in ('AND', 'OR', 'NOT') else ('value', word))
+    return tokens
+
+# ----------------------------
+# Expression
+# A compiled expression.  'evaluate' may be called from a worker thread; the (optional) cache
+# holds column conversions (i.e. parsed dates) re-used across evaluations of the same data.
+class Expression():
+# ----------------------------
+    def __init__(self, text, node):
+        self.text = text
+        self.node = node
+
+    def evaluate(self, df, cache=None):
+        return self.node(df, {} if cache is None else cache)
+
+# prepare
+# Fill the cache with the column conversions used by the default fields and date predicates,
+# i.e. ahead of the first expression typed.
+def prepare(df, cache):
+    for column in DEFAULT_FIELDS:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype) and pa is not None:
+            text_buffer(df, cache, column)
+    for column in df.columns:
+        if column.endswith('date') and column not in cache:
+            cache[column] = parse_dates(df[column])
+
+# ----------------------------
+# Parser
+# Recursive descent parser producing the predicate tree
+class Parser():
+# ----------------------------
+    def __init__(self, tokens, df):
+        self.tokens = tokens
+        self.position = 0
+        self.df = df
+        self.fields = {}
+        for column in df.columns:
+            self.fields[column.strip().lower()] = column
+            self.fields[column.strip().lower().replace(' ', '')] = column
+        for alias, column in ALIASES.items():
+            if column in df.columns:
+                self.fields[alias] = column
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def next(self):
+        token = self.peek()
+        if token is None:
+            raise ExpressionError('Unexpected end of expression')
+        self.position += 1
+        return token
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() == ('keyword', 'OR'):
+            self.next()
+            left, right = node, self.parse_and()
+            node = lambda df, cache, left=left, right=right: left(df, cache) | right(df, cache)
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek() is not None and self.peek() not in (('keyword', 'OR'), ('op', ')')):
+            if self.peek() == ('keyword', 'AND'):
+                self.next()
+            left, right = node, self.parse_not()
+            node = lambda df, cache, left=left, right=right: left(df, cache) & right(df, cache)
+        return node
+
+    def parse_not(self):
+        if self.peek() == ('keyword', 'NOT'):
+            self.next()
+            operand = self.parse_not()
+            return lambda df, cache: ~operand(df, cache)
+        return self.parse_atom()
+
+    def parse_atom(self):
+        kind, value = self.next()
+        if (kind, value) == ('op', '('):
+            node = self.parse_or()
+            if self.next() != ('op', ')'):
+                raise ExpressionError('Expected ")"')
+            return node
+
+        if kind != 'value':
+            raise ExpressionError(f'Unexpected "{value}"')
+
+        # field <op> value
+        token = self.peek()
+        if token is not None and token[0] == 'op' and token[1] not in '()':
+            self.next()
+            kind, operand = self.next()
+            if kind != 'value':
+                raise ExpressionError(f'Expected a value after "{value}{token[1]}"')
+            return self.predicate(self.field(value), token[1], operand)
+
+        # Bare value
+        columns = [column for column in DEFAULT_FIELDS if column in self.df.columns]
+        if not columns:
+            raise ExpressionError(f'No default field to search for "{value}"')
+        nodes = [self.predicate(column, ':~', value) for column in columns]
+        return lambda df, cache: np.logical_or.reduce([node(df, cache) for node in nodes])
+
+    def field(self, name):
+        column = self.fields.get(name.lower())
+        if column is None:
+            raise ExpressionError(f'Unknown field "{name}"')
+        return column
+
+    def predicate(self, column, op, value):
+        series = self.df[column]
+        if op == ':~':
+            return lambda df, cache: contains_mask(df, cache, column, value.lower())
+
+        if column.endswith('date'):
+            return date_predicate(column, op, value)
+
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            try:
+                number = float(value)
+            except ValueError:
+                raise ExpressionError(f'Field "{column.strip()}" expects a number: {value}') from None
+            return lambda df, cache: compare(df[column].to_numpy(), op, number)
+
+        # Text
+        if op in (':', '='):
+            target = value.lower()
+            return lambda df, cache: text_mask(df, cache, column, lambda s: s == target)
+        if op == '!=':
+            target = value.lower()
+            return lambda df, cache: ~text_mask(df, cache, column, lambda s: s == target)
+        target = value.lower()
+        return lambda df, cache: text_mask(df, cache, column, lambda s: compare(s, op, target))
+
+# Evaluate the text operation over the lower case values of the column.  For categoricals, the
+# operation is evaluated once per category and mapped back to the rows via their codes.
+# Otherwise, the lower case values are computed once and cached.
+def text_mask(df, cache, column, operation):
+    series = df[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = pd.Series(series.cat.categories.astype(str)).str.lower()
+        hits = np.append(as_mask(operation(categories)), False)    # Code -1 (missing) -> False
+        return hits[series.cat.codes.to_numpy()]
+    return as_mask(operation(lower_text(df, cache, column)))
+
+def lower_text(df, cache, column):
+    key = (column, 'lower')
+    if key not in cache:
+        series = df[column]
+        if not pd.api.types.is_string_dtype(series.dtype):
+            series = series.astype(str)
+        cache[key] = series.str.lower()
+    return cache[key]
+
+# Case-insensitive 'contains'.  Other than for categoricals, the lower case values are scanned
+# as a single UTF-8 buffer (see find_rows) rather than value by value.
+def contains_mask(df, cache, column, needle):
+    if pa is None or isinstance(df[column].dtype, pd.CategoricalDtype):
+        return text_mask(df, cache, column, lambda s: s.str.contains(needle, regex=False))
+    data, offsets = text_buffer(df, cache, column)
+    return find_rows(data, offsets, needle.encode())
+
+# The lower case values of the column as their UTF-8 bytes and the offsets of each row within
+def text_buffer(df, cache, column):
+    key = (column, 'utf8')
+    if key not in cache:
+        array = pa.array(lower_text(df, cache, column).array, type=pa.large_string(), from_pandas=True)
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        buffers = array.buffers()
+        offsets = np.frombuffer(buffers[1], dtype=np.int64, count=len(array) + 1, offset=array.offset * 8)
+        data = np.frombuffer(buffers[2], dtype=np.uint8) if buffers[2] is not None else np.zeros(0, dtype=np.uint8)
+        cache[key] = (data[:offsets[-1]], offsets)
+    return cache[key]
+
+# find_rows
+# The rows whose bytes contain the needle.  Candidate positions are found by comparing the
+# leading bytes of the needle as a single word (up to 4 bytes) at each alignment of the buffer,
+# then narrowed by the remaining bytes.  Matches spanning two rows are discarded.
+def find_rows(data, offsets, needle):
+    rows = len(offsets) - 1
+    if not needle:
+        return np.ones(rows, dtype=bool)
+
+    width = 4 if len(needle) >= 4 else 2 if len(needle) >= 2 else 1
+    dtype = {1: np.uint8, 2: np.uint16, 4: np.uint32}[width]
+    word = np.frombuffer(needle[:width], dtype=dtype)[0]
+    candidates = []
+    for start in range(min(width, len(data))):
+        words = np.frombuffer(data, dtype=dtype, count=(len(data) - start) // width, offset=start)
+        candidates.append(np.flatnonzero(words == word) * width + start)
+    positions = np.sort(np.concatenate(candidates)) if candidates else np.zeros(0, dtype=np.int64)
+
+    positions = positions[positions <= len(data) - len(needle)]
+    for i in range(width, len(needle)):
+        positions = positions[data[positions + i] == needle[i]]
+
+    matched = np.searchsorted(offsets, positions, 'right') - 1
+    within = (matched >= 0) & (positions + len(needle) <= offsets[np.minimum(matched + 1, rows)])
+    mask = np.zeros(rows, dtype=bool)
+    mask[matched[within]] = True
+    return mask
+
+def as_mask(result):
+    return pd.Series(result).fillna(False).to_numpy(dtype=bool)
+
+def compare(values, op, target):
+    if op in (':', '='):
+        return as_mask(values == target)
+    if op == '!=':
+        return as_mask(values != target)
+    if op == '>':
+        return as_mask(values > target)
+    if op == '>=':
+        return as_mask(values >= target)
+    if op == '<':
+        return as_mask(values < target)
+    return as_mask(values <= target)
+
+def date_predicate(column, op, value):
+    try:
+        start = pd.Timestamp(value)
+    except ValueError:
+        raise ExpressionError(f'Field "{column.strip()}" expects a date: {value}') from None
+    if start.tzinfo is not None:
+        start = start.tz_convert('UTC').tz_localize(None)
+    start = start.to_datetime64()
+
+    # A date without a time covers the whole day
+    end = start + np.timedelta64(1, 'D') if DATE.match(value) else None
+
+    def evaluate(df, cache):
+        # Dates are compared as naive UTC values, parsed once per column
+        if column not in cache:
+            cache[column] = parse_dates(df[column])
+        dates = cache[column]
+        if end is None:
+            return compare(dates, op, start)
+        if op in (':', '='):
+            return (dates >= start) & (dates < end)
+        if op == '!=':
+            return ~((dates >= start) & (dates < end))
+        if op == '>':
+            return dates >= end
+        if op == '<=':
+            return dates < end
+        return compare(dates, op, start)
+    return evaluate
+
+# The naive UTC datetime64 values of the (ISO 8601) text.  Categoricals parse each category
+# once; other text is cast by Arrow, falling back to pandas for anything Arrow rejects.
+def parse_dates(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = to_utc(pd.Series(series.cat.categories.astype(object)))
+        return np.append(categories, np.datetime64('NaT', 'ns'))[series.cat.codes.to_numpy()]
+
+    if pa is not None and pd.api.types.is_string_dtype(series.dtype):
+        try:
+            array = pa.array(series.array, type=pa.large_string(), from_pandas=True)
+            return array.cast(pa.timestamp('ns', tz='UTC')).to_numpy(zero_copy_only=False).astype('datetime64[ns]')
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass
+    return to_utc(series)
+
+def to_utc(series):
+    dates = pd.to_datetime(series.astype(object), utc=True, errors='coerce', format='ISO8601')
+    return dates.dt.tz_localize(None).to_numpy(dtype='datetime64[ns]')
@@ -6,12 +6,14 @@
 
 from PySide6.QtWidgets import QWidget, QLabel, QComboBox, QLineEdit, QPushButton, \
 							  QGridLayout, QVBoxLayout, QHBoxLayout, QDialog, QSpinBox, \
-                              QSpacerItem, QSizePolicy
-from PySide6.QtCore import Qt, Signal, QObject
-from PySide6.QtGui import QColor, QIcon, QPixmap
-import asyncio
+                              QSpacerItem, QSizePolicy, QToolButton, QMenu, QInputDialog, QToolTip
+from PySide6.QtCore import Qt, Signal, QObject, QTimer, QEvent
+from PySide6.QtGui import QColor, QIcon, QPixmap, QAction
+import asyncio, threading
 
 from .TreeComponents import PortfolioTreeView, DataFrameModel, FilterHeaderView
+from .Expression import compile_expression
+from .SavedSearches import SavedSearch
 
 # ----------------------------
 # Settings
@@ -92,6 +94,12 @@ class InputFrame(QWidget):
         self.query = QLineEdit(self)
         self.submit_btn = QPushButton('Submit', self)
         self.submit_btn.clicked.connect(self.on_submit)
+        self.saved_btn = QToolButton(self)
+        self.saved_btn.setText('Saved')
+        self.saved_btn.setPopupMode(QToolButton.InstantPopup)
+        self.saved_menu = QMenu(self)
+        self.saved_menu.aboutToShow.connect(self.populateSaved)
+        self.saved_btn.setMenu(self.saved_menu)
         spacer = QSpacerItem(0, 0, QSizePolicy.Expanding, QSizePolicy.Minimum)
         settings_btn = QLabel("...", self)
         settings_btn.setCursor(Qt.PointingHandCursor)
@@ -107,8 +115,9 @@ class InputFrame(QWidget):
         layout.addWidget(self.query, 0, 3)
         self.query.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
         layout.addWidget(self.submit_btn, 0, 4)
-        layout.addItem(spacer, 0, 5)
-        layout.addWidget(settings_btn, 0, 6, 1, 2, Qt.AlignRight)
+        layout.addWidget(self.saved_btn, 0, 5)
+        layout.addItem(spacer, 0, 6)
+        layout.addWidget(settings_btn, 0, 7, 1, 2, Qt.AlignRight)
         layout.setContentsMargins(0, 0, 0, 0)        
         self.setLayout(layout)
 
@@ -122,6 +131,7 @@ class InputFrame(QWidget):
     def setSubmitState(self, enabled):
         self.submit_btn.setEnabled(enabled)
         self.query.setEnabled(enabled)
+        self.saved_btn.setEnabled(enabled)
 
     def on_submit(self):
         asyncio.ensure_future(self.submitRequest())
@@ -138,12 +148,58 @@ class InputFrame(QWidget):
     def open_settings(self, event):
         self.settings.show()
 
+    # Saved searches menu - save the current search, run or remove a saved search.  Searches
+    # whose results changed since last viewed are marked.
+    def populateSaved(self):
+        self.saved_menu.clear()
+        saved = self.controller.saved
+
+        save = QAction("Save current search...", self)
+        save.triggered.connect(self.saveSearch)
+        self.saved_menu.addAction(save)
+        if not saved.searches:
+            return
+
+        self.saved_menu.addSeparator()
+        remove = QMenu("Remove", self)
+        for search in saved.searches:
+            label = f'{search.name} ({search.count})' if search.count is not None else search.name
+            action = QAction(f'{label} - changed' if search.changed else label, self)
+            action.triggered.connect(lambda checked=False, search=search: self.runSearch(search))
+            self.saved_menu.addAction(action)
+            action = QAction(search.name, self)
+            action.triggered.connect(lambda checked=False, name=search.name: saved.remove(name))
+            remove.addAction(action)
+        self.saved_menu.addSeparator()
+        self.saved_menu.addMenu(remove)
+
+    def saveSearch(self):
+        query = self.query.text().strip()
+        name, ok = QInputDialog.getText(self, "Save Search", "Name:", text=query or self.types.currentText())
+        if ok and name.strip():
+            self.controller.saved.add(SavedSearch(name.strip(), self.types.currentIndex(), query if query else None,
+                                                  int(self.settings.maxPortfolioCnt)))
+
+    def runSearch(self, search):
+        search.changed = False
+        self.types.setCurrentIndex(search.typeIndex)
+        self.query.setText(search.query or "")
+        asyncio.ensure_future(self.controller.processSubmit(search.typeIndex, search.query, search.maxCount))
+
 # ----------------------------
 # DataFrame
 # Represents the main control that presents our portfolios retrieved from the service
 class DataFrame(QWidget):
     class DataChanged(QObject):
         dataChanged = Signal(str)
+        memoryChanged = Signal(str, str)    # total, per-column details
+        error = Signal(str)
+
+    # Results of this size, or larger, are displayed using the high-throughput rendering mode
+    LARGE_RESULT = 50000
+
+    # Grouping choices and the column they group by
+    GROUPINGS = {'No grouping': None, 'Family': 'family', 'Org code': 'org code', 'Portfolio type': 'type'}
 
     def __init__(self, parent=None, controller=None):
         super(DataFrame, self).__init__(parent)
@@ -152,24 +208,60 @@ class DataFrame(QWidget):
         self.tree = PortfolioTreeView(self)
         self.header = FilterHeaderView()
 
+        # Filter bar - refines the loaded results using a search expression (see Expression)
+        lbl = QLabel('Filter:', self)
+        self.filter = QLineEdit(self)
+        self.filter.setPlaceholderText('e.g. name:~"msci" AND family:Equity AND constituents>500 AND modified>2025-01-01')
+        self.filter.setClearButtonEnabled(True)
+        self.filter.returnPressed.connect(self.on_filter)
+        self.filter.textChanged.connect(lambda text: text or self.on_filter())
+        self.generation = 0
+
+        # Grouping of the loaded results
+        group_lbl = QLabel('Group by:', self)
+        self.grouping = QComboBox(self)
+        self.grouping.addItems(list(self.GROUPINGS))
+        self.grouping.currentTextChanged.connect(self.on_grouping)
+        self.expanded = []
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(lbl)
+        filter_layout.addWidget(self.filter)
+        filter_layout.addWidget(group_lbl)
+        filter_layout.addWidget(self.grouping)
+
         # Create the layout and add the widgets
         layout = QVBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)        
+        layout.addLayout(filter_layout)
         layout.addWidget(self.tree)
         self.setLayout(layout)
 
         # Monitor grid change
         self.gridChanged = DataFrame.DataChanged()       
 
-    def displayPortfolios(self, data):
+    def displayPortfolios(self, data, progress=None):
+        # A new result set starts unfiltered
+        self.generation += 1
+        self.filter.blockSignals(True)
+        self.filter.clear()
+        self.filter.blockSignals(False)
+
         # Create the DataFrameModel and assign
-        model = DataFrameModel(data, self.gridChanged, self)
+        model = DataFrameModel(data, self.gridChanged, self, progress)
         self.tree.setModel(model)
 
         # Assign the header view
         self.tree.setHeader(self.header)
 
+        self.tree.setHighThroughput(len(data) >= self.LARGE_RESULT)
         self.tree.setColumnWidth(0, 60)
+        self.tree.autoSizeColumns(skip=(0,))
+
+        # Groups are re-built upon sorting and filtering - keep them expanded
+        model.modelAboutToBeReset.connect(self.saveExpanded)
+        model.modelReset.connect(lambda: QTimer.singleShot(0, self.restoreExpanded))
+        self.on_grouping(self.grouping.currentText())
 
         # Enable sorting
         if not self.tree.isSortingEnabled():
@@ -177,6 +269,63 @@ class DataFrame(QWidget):
 
         self.tree.setHeaderHidden(False)
 
+        # Search expressions are ready to evaluate by the time one is typed
+        threading.Thread(target=model.prepareExpressions, name='PrepareExpressions', daemon=True).start()
+
+    def on_grouping(self, text):
+        model = self.tree.model()
+        if model is None:
+            return
+
+        column = self.GROUPINGS[text]
+        if model.setGrouping(column) != column:
+            self.gridChanged.error.emit(f'Unable to group by {text.lower()} - not available within the results')
+        self.tree.setGrouped(model.groupColumn is not None)
+
+    # The expanded groups are remembered across a model reset
+    def saveExpanded(self):
+        model = self.tree.model()
+        self.expanded = []
+        if model.groupColumn is not None:
+            self.expanded = [(model.groupColumn, group) for row, group in enumerate(model.groups)
+                             if self.tree.isExpanded(model.index(row, 0))]
+
+    def restoreExpanded(self):
+        model = self.tree.model()
+        self.tree.spanGroups()
+        if model is None or model.groupColumn is None:
+            return
+        for row, group in enumerate(model.groups):
+            if (model.groupColumn, group) in self.expanded:
+                self.tree.expand(model.index(row, 0))
+
+    def on_filter(self):
+        asyncio.ensure_future(self.applyExpression(self.filter.text().strip()))
+
+    # applyExpression
+    # Compile the search expression once, then evaluate it over the loaded results within a
+    # worker so the UI remains responsive.  Results of a superseded evaluation are ignored.
+    async def applyExpression(self, text):
+        model = self.tree.model()
+        if model is None:
+            return
+
+        self.generation += 1
+        generation = self.generation
+        if not text:
+            model.apply_expression(None, None)
+            return
+
+        try:
+            expression = compile_expression(text, model.master_df)
+            mask = await asyncio.get_event_loop().run_in_executor(None, model.evaluate, expression)
+        except Exception as e:
+            self.gridChanged.error.emit(f'Invalid filter: {e}')
+            return
+
+        if generation == self.generation and model is self.tree.model():
+            model.apply_expression(expression, mask)
+
 
 # ----------------------------
 # StatusFrame
@@ -191,12 +340,37 @@ class StatusFrame(QWidget):
 
         self.statusMsg = "Initializing..."
         self.lbl1 = QLabel(self.statusMsg)
+
+        # Request metrics (i.e. RequestScheduler.metrics) presented as a tooltip of the status
+        self.metrics = None
+        self.lbl1.installEventFilter(self)
+
+        # Memory held by the loaded results
+        self.memory = QLabel("")
+        self.memory.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
         
-        layout = QVBoxLayout()
+        layout = QHBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)
-        layout.addWidget(self.lbl1)
+        layout.addWidget(self.lbl1, 1)
+        layout.addWidget(self.memory)
         self.setLayout(layout)
 
+    def eventFilter(self, obj, event):
+        if obj is self.lbl1 and event.type() == QEvent.ToolTip and self.metrics is not None:
+            m = self.metrics()
+            QToolTip.showText(event.globalPos(),
+                              f"Requests queued: {m['queued']}, in flight: {m['inFlight']}\n"
+                              f"Throughput: {m['throughput'] * 60:.0f}/min, rate limit: {m['rate']:.1f}/sec\n"
+                              f"Throttled: {m['throttled']}" + (f", paused for {m['paused']:.0f} sec" if m['paused'] else ""),
+                              self.lbl1)
+            return True
+        return super(StatusFrame, self).eventFilter(obj, event)
+
+    # Present the total memory of the loaded results, with the bytes per column as a tooltip
+    def set_memory(self, total, details):
+        self.memory.setText(total)
+        self.memory.setToolTip(details)
+
     def set_status(self, message, error):
         self.statusMsg = message
         self.lbl1.setText(self.statusMsg)
@@ -11,18 +11,111 @@ from httpx import ReadTimeout
 import asyncio
 import pandas as pd
 
+from .Scheduler import RequestScheduler, retry_after
+from .Daemon import DaemonClient, DaemonUnavailable
+
+# Compressed transfer encodings we can decode - brotli only when its decoder is installed
+try:
+	import brotli
+	ACCEPT_ENCODING = 'br, gzip, deflate'
+except ImportError:
+	ACCEPT_ENCODING = 'gzip, deflate'
+
+# project
+# Reduce the 'portfolioHeaders' to columns ({field: [values]}) - the specified fields first, in
+# their order, followed by any other field not excluded.  Unknown fields are therefore kept.
+# Nested fields ('parent.child') are flattened into a column named by the child, dropping the
+# rest of the parent.  Fields absent from every header are omitted.
+def project(headers, fields, excluded=()):
+	present = set().union(*headers)
+	nested = {field.partition('.')[0] for field in fields if '.' in field}
+	others = [field for field in dict.fromkeys(list(headers[0] if headers else []) + sorted(present))
+			  if field not in fields and field not in nested and field not in excluded]
+
+	columns = {}
+	for field in fields + others:
+		parent, _, child = field.partition('.')
+		if parent not in present:
+			continue
+		if child:
+			values = [header.get(parent) for header in headers]
+			columns[child] = [value.get(child, "") if isinstance(value, dict) else "" for value in values]
+		else:
+			columns[parent] = [header.get(parent) for header in headers]
+	return columns
+
+# Whether the platform rejected the request because of the (unsupported) 'fields' parameter
+def rejects_fields(raw):
+	if raw is None or raw.status_code != 400:
+		return False
+	try:
+		return 'fields' in raw.text.lower()
+	except Exception:
+		return False
+
+def row_count(columns):
+	return len(next(iter(columns.values()))) if columns else 0
+
 # ----------------------------
 # PAM class implements the Portfolio Search API call to retrieve the list of
 # portfolios based on the requested parameters.
 class PAM():
 # ----------------------------
-	def __init__(self, controller):
+	# Every request, from any instance, is paced by the same scheduler
+	scheduler = RequestScheduler()
+
+	# The header fields presented (see DataFrameModel), in the order of the grid.  When the platform
+	# supports field selection only these are requested.  Otherwise, every field other than the
+	# EXCLUDED is decoded (see project).
+	FIELDS = ['extendedProperties.family', 'portfolioId', 'name', 'code', 'type', 'numberOfConstituents',
+			  'description', 'ownerId', 'organizationCode', 'realm', 'createdDateTime', 'lastModifiedDateTime']
+	EXCLUDED = ['accessibility']
+
+	# Field selection is requested of the platform until it rejects the 'fields' parameter
+	fieldSelection = True
+
+	# When 'daemon' is set, requests are served by the local catalog daemon (see Daemon) if running
+	def __init__(self, controller, daemon=True):
 		self.URL = 'https://api.refinitiv.com/user-data/portfolio-management/v1/portfolios/search'
 		self.controller = controller
-		self.definition = None
+		self.warmedUp = False
+		self.daemon = DaemonClient() if daemon else None
+		self.viaDaemon = False
+
+	# Determine whether requests can be served by the local catalog daemon
+	async def daemonAvailable(self):
+		self.viaDaemon = self.daemon is not None and await self.daemon.ping()
+		return self.viaDaemon
 
 	# Request for the list of portfolios based on the specified request details.
-	async def requestPortfolios(self, types: List[str], query: str, maxCount: int):
+	# Optionally, a 'progress' object (see ProgressOverlay) is notified as the request advances.
+	# Background requests (i.e. refreshes) yield to interactive ones when throttled.
+	async def requestPortfolios(self, types: List[str], query: str, maxCount: int, progress=None,
+								priority=RequestScheduler.INTERACTIVE):
+		return pd.DataFrame(await self.requestColumns(types, query, maxCount, progress, priority))
+
+	# Request for the 'portfolioHeaders', projected to the FIELDS as columns (see project) - via the
+	# local daemon when running, otherwise directly from the platform.
+	async def requestColumns(self, types: List[str], query: str, maxCount: int, progress=None,
+							 priority=RequestScheduler.INTERACTIVE):
+		if self.daemon is not None:
+			try:
+				columns = await self.daemon.search(types, query, maxCount, priority, progress)
+				self.viaDaemon = True
+				if progress is not None:
+					progress.setRows(row_count(columns))
+				return columns
+			except DaemonUnavailable:
+				self.viaDaemon = False
+
+			# The daemon is gone - ensure we have our own session to talk to the platform
+			if self.controller is not None and self.controller.session is None:
+				if not await self.controller.connect():
+					raise RuntimeError(self.controller.err or "Unable to connect")
+
+		return await self.requestPlatform(types, query, maxCount, progress, priority)
+
+	async def requestPlatform(self, types, query, maxCount, progress, priority):
 		params = {}
 
 		params["maximumCount"] = maxCount
@@ -35,18 +128,37 @@ class PAM():
 			params["queryField"] = "Any"
 			params["queryCondition"] = "Contains"
 
-		# Prepare endpoint definition...
-		if self.definition is None:
-			# Note: The 1st endpoint definition request will block and load modules thus we wrap an async/await
-			self.definition = await asyncio.get_event_loop().run_in_executor(None, endpoint_request.Definition, self.URL)
-		
-		self.definition.query_parameters = params
+		if PAM.fieldSelection:
+			params["fields"] = ",".join(dict.fromkeys(field.partition('.')[0] for field in self.FIELDS))
+
+		# One-time warm-up: the 1st endpoint definition blocks while loading modules, thus we wrap it
+		# within an executor.  Requests build their own definitions (see submit).
+		if not self.warmedUp:
+			await asyncio.get_event_loop().run_in_executor(None, endpoint_request.Definition, self.URL)
+			self.warmedUp = True
 
 		# Submit request
 		try:
-			response = await self.definition.get_data_async()
+			if progress is not None:
+				progress.setStage("Waiting for response...")
+
+			response = await self.submit(params, priority)
+			if "fields" in params and rejects_fields(response.raw):
+				# Field selection is not supported - decode time projection alone reduces the fields
+				PAM.fieldSelection = False
+				del params["fields"]
+				response = await self.submit(params, priority)
+
+			if progress is not None:
+				self.reportDownload(response.raw, progress)
+
 			if response.is_success:
-				return pd.DataFrame(response.data.raw['portfolioHeaders'])
+				# Projecting a large result takes a while - keep it off the event loop
+				columns = await asyncio.get_event_loop().run_in_executor(
+					None, project, response.data.raw['portfolioHeaders'], self.FIELDS, self.EXCLUDED)
+				if progress is not None:
+					progress.setRows(row_count(columns))
+				return columns
 			
 			# Throw an exception
 			print(f'reason_phrase: {response.raw.reason_phrase}')
@@ -66,3 +178,27 @@ class PAM():
 			if len(e.args) > 0:
 				reason = f'{reason} {e.args[0]}'
 			raise RuntimeError(f"Request failed. {reason}") from None
+
+	# Each request uses its own definition, allowing requests to run concurrently (i.e. background refreshes)
+	async def submit(self, params, priority):
+		definition = endpoint_request.Definition(self.URL, query_parameters=params,
+												 header_parameters={'Accept-Encoding': ACCEPT_ENCODING})
+		return await PAM.scheduler.submit(definition.get_data_async, self.outcome, priority)
+
+	# Report the number of bytes received over the wire for the specified (httpx) response
+	def reportDownload(self, raw, progress):
+		received = getattr(raw, 'num_bytes_downloaded', None)
+		if not received:
+			received = len(raw.content)
+		total = raw.headers.get('Content-Length')
+		progress.setBytes(received, int(total) if total else None)
+
+	# The outcome of the request for the scheduler - when throttled (HTTP 429), along with the seconds to wait
+	def outcome(self, response):
+		raw = response.raw
+		if raw is not None and raw.status_code == 429:
+			wait = retry_after(raw.headers.get('Retry-After'))
+			return RequestScheduler.THROTTLED, 0 if wait is None else wait
+		if response.is_success:
+			return RequestScheduler.SUCCEEDED, None
+		return RequestScheduler.FAILED, None
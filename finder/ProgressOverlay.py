@@ -0,0 +1,170 @@
+#=============================================================================
+#   This source code is provided under the Apache 2.0 license
+#   and is provided AS IS with no warranty or guarantee of fit for purpose.
+#   Copyright (C) 2024 LSEG. All rights reserved.
+#=============================================================================
+
+from PySide6.QtWidgets import QWidget, QLabel, QPushButton, QFrame, QVBoxLayout, QHBoxLayout
+from PySide6.QtCore import Qt, Signal, QTimer, QEvent
+from PySide6.QtGui import QColor, QPainter
+import time
+
+from .waitingspinnerwidget import QtWaitingSpinner
+from .Columnar import format_bytes
+
+# ----------------------------
+# ProgressOverlay
+# A single, reusable overlay presented over the results grid while a request is outstanding.
+# The request pipeline reports its progress (connection state, bytes received, rows decoded
+# and model build steps) through the set* methods below.  Counters are only recorded when
+# reported; the labels are refreshed by a timer at a throttled rate so a large load adds
+# negligible work to the UI thread.
+#
+# Note: Bytes arrive as they are received only from the local daemon.  The platform library
+# returns the response once complete, so its size is reported once, after the download.  The
+# model is built synchronously, leaving the timer no chance to fire, so its progress repaints
+# the overlay directly - at the same throttled rate.
+class ProgressOverlay(QWidget):
+    # Emitted when the user presses the 'Cancel' button
+    cancelled = Signal()
+
+    # Refresh interval (ms) of the progress details
+    REFRESH_INTERVAL = 100
+
+    def __init__(self, parent):
+        super(ProgressOverlay, self).__init__(parent)
+
+        self.stage = ""
+        self.bytesReceived = 0
+        self.bytesTotal = None
+        self.rows = 0
+        self.modelStep = 0
+        self.modelSteps = 0
+        self.dirty = False
+        self.refreshed = 0
+
+        # The one and only spinner, re-used for every request
+        self.spinner = QtWaitingSpinner(self, centerOnParent=False)
+
+        # Progress details
+        self.stageLbl = QLabel(self)
+        self.detailLbl = QLabel(self)
+        self.stageLbl.setAlignment(Qt.AlignCenter)
+        self.detailLbl.setAlignment(Qt.AlignCenter)
+        font = self.stageLbl.font()
+        font.setBold(True)
+        self.stageLbl.setFont(font)
+
+        self.cancel_btn = QPushButton("Cancel", self)
+        self.cancel_btn.clicked.connect(self.on_cancel)
+
+        # Layout the controls within a small panel centered over the parent
+        panel = QFrame(self)
+        panel.setFrameShape(QFrame.StyledPanel)
+        panel.setStyleSheet("QFrame { background-color: rgb(245, 245, 245); }")
+        panel_layout = QVBoxLayout(panel)
+        panel_layout.addWidget(self.spinner, 0, Qt.AlignHCenter)
+        panel_layout.addWidget(self.stageLbl)
+        panel_layout.addWidget(self.detailLbl)
+        button_layout = QHBoxLayout()
+        button_layout.addStretch(1)
+        button_layout.addWidget(self.cancel_btn)
+        button_layout.addStretch(1)
+        panel_layout.addLayout(button_layout)
+        panel.setMinimumWidth(280)
+
+        layout = QVBoxLayout(self)
+        layout.addStretch(1)
+        layout.addWidget(panel, 0, Qt.AlignHCenter)
+        layout.addStretch(1)
+        self.setLayout(layout)
+
+        # Throttled refresh of the progress details
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.REFRESH_INTERVAL)
+        self.timer.timeout.connect(self.refresh)
+
+        # Track the size of our parent so we always cover it
+        parent.installEventFilter(self)
+        self.hide()
+
+    def eventFilter(self, obj, event):
+        if obj is self.parentWidget() and event.type() == QEvent.Resize:
+            self.setGeometry(obj.rect())
+        return False
+
+    def paintEvent(self, event):
+        # Dim the area we cover
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(255, 255, 255, 160))
+
+    def start(self):
+        self.stage = ""
+        self.bytesReceived = 0
+        self.bytesTotal = None
+        self.rows = 0
+        self.modelStep = 0
+        self.modelSteps = 0
+        self.cancel_btn.setEnabled(True)
+        self.refresh(True)
+
+        self.setGeometry(self.parentWidget().rect())
+        self.raise_()
+        self.show()
+        self.spinner.start()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.spinner.stop()
+        self.hide()
+
+    def on_cancel(self):
+        self.cancel_btn.setEnabled(False)
+        self.setStage("Cancelling...")
+        self.cancelled.emit()
+
+    # Stage transitions are infrequent, so present them immediately
+    def setStage(self, stage):
+        self.stage = stage
+        self.refresh(True)
+
+    def setBytes(self, received, total=None):
+        self.bytesReceived = received
+        self.bytesTotal = total
+        self.dirty = True
+
+    def setRows(self, rows):
+        self.rows = rows
+        self.dirty = True
+
+    def setModelProgress(self, step, steps):
+        self.modelStep = step
+        self.modelSteps = steps
+        self.dirty = True
+        if time.monotonic() - self.refreshed >= self.REFRESH_INTERVAL / 1000:
+            self.refresh(True)
+
+    def details(self):
+        details = []
+        if self.bytesReceived:
+            received = format_bytes(self.bytesReceived)
+            if self.bytesTotal:
+                received = f'{received} of {format_bytes(self.bytesTotal)}'
+            details.append(f'{received} received')
+        if self.rows:
+            details.append(f'{self.rows:,} rows')
+        if self.modelSteps:
+            details.append(f'grid {int(100 * self.modelStep / self.modelSteps)}%')
+        return ", ".join(details)
+
+    def refresh(self, force=False):
+        if not (self.dirty or force):
+            return
+
+        self.dirty = False
+        self.refreshed = time.monotonic()
+        self.stageLbl.setText(self.stage)
+        self.detailLbl.setText(self.details())
+        if force and self.isVisible():
+            self.repaint()
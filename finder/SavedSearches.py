@@ -0,0 +1,171 @@
+#=============================================================================
+#   This source code is provided under the Apache 2.0 license
+#   and is provided AS IS with no warranty or guarantee of fit for purpose.
+#   Copyright (C) 2024 LSEG. All rights reserved.
+#=============================================================================
+
+from PySide6.QtGui import QCursor
+import numpy as np
+import pandas as pd
+import asyncio, json, os, random, time
+
+from .Scheduler import RequestScheduler
+from .PAM import row_count
+
+# ----------------------------
+# SavedSearch
+# The parameters of a standing lookup (see InputFrame) along with the state of its last refresh
+class SavedSearch():
+# ----------------------------
+    def __init__(self, name, typeIndex, query, maxCount, interval=900, fingerprint=None, count=None):
+        self.name = name
+        self.typeIndex = typeIndex
+        self.query = query
+        self.maxCount = maxCount
+        self.interval = interval        # secs between refreshes
+        self.fingerprint = fingerprint
+        self.count = count
+        self.changed = False
+        self.due = None
+
+    def to_dict(self):
+        return {'name': self.name, 'typeIndex': self.typeIndex, 'query': self.query, 'maxCount': self.maxCount,
+                'interval': self.interval, 'fingerprint': self.fingerprint, 'count': self.count}
+
+# Columns identifying a portfolio when its 'portfolioId' is not available
+IDENTIFYING = ['code', 'name', 'type', 'organizationCode', 'realm']
+
+# Identify the result set, given as the columns projected by PAM - independent of the order of the rows
+def fingerprint_of(columns):
+    count = row_count(columns)
+    identity = ['portfolioId'] if 'portfolioId' in columns else IDENTIFYING
+    fields = [field for field in identity + ['lastModifiedDateTime'] if field in columns]
+    if count == 0 or not fields:
+        return f'{count}'
+
+    # Combine the hashes of each row's fields, then sum over the rows
+    hashes = np.zeros(count, dtype=np.uint64)
+    for field in fields:
+        values = np.array(columns[field])
+        if values.dtype.kind not in 'iu':
+            values = np.array([str(value) for value in columns[field]], dtype=object)
+        hashes = hashes * np.uint64(1000003) ^ pd.util.hash_array(values)
+    return f'{count}-{int(hashes.sum()) & 0xFFFFFFFFFFFFFFFF:016x}'
+
+# ----------------------------
+# SavedSearches
+# Maintains the saved searches and refreshes them in the background.  Refreshes re-use the
+# open session, are spread out using jitter and limited in number.  They back off while the
+# application is idle or minimized.  The controller is notified only when the result set of a
+# search actually changed.
+class SavedSearches():
+# ----------------------------
+    PATH = 'saved-searches.json'
+
+    TICK = 5                # secs between checks for due searches
+    MAX_CONCURRENT = 2      # refreshes in flight
+    JITTER = 0.2            # +/- fraction of the interval
+    IDLE_AFTER = 300        # secs without user activity
+    IDLE_BACKOFF = 4        # interval multiplier while idle or minimized
+
+    def __init__(self, controller, path=None):
+        self.controller = controller
+        self.path = path or self.PATH
+        self.searches = []
+        self.active = set()
+        self.semaphore = asyncio.Semaphore(self.MAX_CONCURRENT)
+        self.task = None
+        self.cursor = None
+        self.lastActivity = time.monotonic()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as file:
+                self.searches = [SavedSearch(**search) for search in json.load(file)]
+        except (OSError, ValueError, TypeError) as e:
+            print(f'Unable to load saved searches from {self.path}: {e}')
+
+    def save(self):
+        with open(self.path, 'w') as file:
+            json.dump([search.to_dict() for search in self.searches], file, indent=2)
+
+    def find(self, name):
+        return next((search for search in self.searches if search.name == name), None)
+
+    def add(self, search):
+        existing = self.find(search.name)
+        if existing is not None:
+            self.searches.remove(existing)
+        self.searches.append(search)
+        self.save()
+
+    def remove(self, name):
+        self.searches = [search for search in self.searches if search.name != name]
+        self.save()
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+
+    async def run(self):
+        while True:
+            self.trackActivity()
+            now = time.monotonic()
+            idle = self.isIdle()
+            for search in self.searches:
+                # Spread the initial refreshes across the interval
+                if search.due is None:
+                    search.due = now + random.uniform(0, search.interval)
+
+                # Upon returning from idle, a backed off refresh is brought forward
+                elif not idle and search.due - now > search.interval * (1 + self.JITTER):
+                    search.due = now + random.uniform(0, search.interval * self.JITTER)
+
+                if search.due <= now and search not in self.active:
+                    self.active.add(search)
+                    asyncio.ensure_future(self.refresh(search))
+            await asyncio.sleep(self.TICK)
+
+    # User activity is inferred from movement of the mouse cursor
+    def trackActivity(self):
+        position = QCursor.pos()
+        if position != self.cursor:
+            self.cursor = position
+            self.lastActivity = time.monotonic()
+
+    def isIdle(self):
+        return self.controller.isMinimized() or time.monotonic() - self.lastActivity > self.IDLE_AFTER
+
+    def nextInterval(self, search):
+        interval = search.interval * (self.IDLE_BACKOFF if self.isIdle() else 1)
+        return interval * random.uniform(1 - self.JITTER, 1 + self.JITTER)
+
+    async def refresh(self, search):
+        try:
+            async with self.semaphore:
+                # Only refresh once connected - never open a session on our own
+                if not self.controller.isConnected():
+                    return
+
+                types = self.controller.mapTypeToPortfolioTypes(search.typeIndex)
+                # The results are never presented - no frame is built, and the (projected) columns
+                # are fingerprinted off the event loop
+                columns = await self.controller.pam.requestColumns(types, search.query, search.maxCount,
+                                                                   priority=RequestScheduler.BACKGROUND)
+                fingerprint = await asyncio.get_event_loop().run_in_executor(None, fingerprint_of, columns)
+                count = row_count(columns)
+
+                if search.fingerprint is not None and fingerprint != search.fingerprint:
+                    search.changed = True
+                    self.controller.savedSearchChanged(search, count)
+                search.fingerprint = fingerprint
+                search.count = count
+                self.save()
+        except Exception as e:
+            print(f"Refresh of saved search '{search.name}' failed: {e}")
+        finally:
+            search.due = time.monotonic() + self.nextInterval(search)
+            self.active.discard(search)
@@ -0,0 +1,150 @@
+#=============================================================================
+#   This source code is provided under the Apache 2.0 license
+#   and is provided AS IS with no warranty or guarantee of fit for purpose.
+#   Copyright (C) 2024 LSEG. All rights reserved.
+#=============================================================================
+
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from collections import deque
+import asyncio, heapq, itertools, time
+
+# Seconds to wait based on the value of a 'Retry-After' header (seconds or an HTTP date)
+def retry_after(value):
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+# ----------------------------
+# RequestScheduler
+# A token bucket shared by the platform requests.  Requests wait for a token in priority order
+# - interactive requests ahead of background ones.  The rate adapts to the platform: it is
+# halved when a request is throttled (HTTP 429), pausing all requests for the 'Retry-After'
+# period, and grows slowly again while requests succeed.
+class RequestScheduler():
+# ----------------------------
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+    # Outcomes of a request (see submit)
+    SUCCEEDED = 'succeeded'
+    THROTTLED = 'throttled'
+    FAILED = 'failed'
+
+    INCREASE = 0.1          # requests/sec added upon each success
+    DECREASE = 0.5          # rate multiplier when throttled
+    WINDOW = 60             # secs over which throughput is measured
+
+    def __init__(self, rate=5.0, burst=5, minRate=0.2, maxRate=20.0, retries=3):
+        self.rate = rate
+        self.burst = burst
+        self.minRate = minRate
+        self.maxRate = maxRate
+        self.retries = retries
+
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.pausedUntil = 0
+        self.waiting = []
+        self.sequence = itertools.count()
+        self.wakeup = None
+        self.dispatcher = None
+
+        # Metrics
+        self.inFlight = 0
+        self.completed = deque()
+        self.throttled = 0
+
+    # submit
+    # Run the request (a coroutine function) once a token is available.  The 'outcome' function
+    # inspects the result, returning its outcome (SUCCEEDED, THROTTLED or FAILED) along with the
+    # seconds to wait as advised by the platform when throttled (0 if unknown).  Only successes
+    # grow the rate; throttled requests are retried while failures are returned as they are.
+    async def submit(self, request, outcome, priority=INTERACTIVE):
+        for attempt in range(self.retries + 1):
+            await self.acquire(priority)
+            self.inFlight += 1
+            try:
+                result = await request()
+            finally:
+                self.inFlight -= 1
+
+            state, wait = outcome(result)
+            if state == self.SUCCEEDED:
+                self.succeeded()
+                return result
+            if state == self.FAILED:
+                return result
+
+            self.backoff(wait)
+
+        return result
+
+    async def acquire(self, priority):
+        loop = asyncio.get_event_loop()
+        if self.dispatcher is None or self.dispatcher.done():
+            self.wakeup = asyncio.Event()
+            self.dispatcher = loop.create_task(self.dispatch())
+
+        future = loop.create_future()
+        heapq.heappush(self.waiting, (priority, next(self.sequence), future))
+        self.wakeup.set()
+        await future
+
+    # Hand out tokens to the waiting requests, highest priority first
+    async def dispatch(self):
+        while True:
+            # Discard requests no longer waiting (i.e. cancelled)
+            while self.waiting and self.waiting[0][2].done():
+                heapq.heappop(self.waiting)
+
+            if not self.waiting:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            if now < self.pausedUntil:
+                await asyncio.sleep(self.pausedUntil - now)
+                continue
+
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+
+            self.tokens -= 1
+            heapq.heappop(self.waiting)[2].set_result(None)
+
+    def succeeded(self):
+        self.rate = min(self.maxRate, self.rate + self.INCREASE)
+        self.completed.append(time.monotonic())
+
+    def backoff(self, wait):
+        self.throttled += 1
+        self.rate = max(self.minRate, self.rate * self.DECREASE)
+        self.tokens = 0
+        self.updated = time.monotonic()
+        self.pausedUntil = max(self.pausedUntil, self.updated + (wait or 1 / self.rate))
+
+    def metrics(self):
+        now = time.monotonic()
+        while self.completed and now - self.completed[0] > self.WINDOW:
+            self.completed.popleft()
+
+        return {
+            'queued': sum(1 for entry in self.waiting if not entry[2].done()),
+            'inFlight': self.inFlight,
+            'throughput': len(self.completed) / self.WINDOW,     # requests/sec
+            'rate': self.rate,
+            'throttled': self.throttled,
+            'paused': max(0.0, self.pausedUntil - now),
+        }
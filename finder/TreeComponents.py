@@ -1,19 +1,82 @@
-from PySide6.QtWidgets import QApplication, QTreeView, QMenu, QHeaderView, QGraphicsDropShadowEffect
+from PySide6.QtWidgets import QApplication, QTreeView, QMenu, QHeaderView, QGraphicsDropShadowEffect, QStyle
 from PySide6.QtCore import QAbstractItemModel, QModelIndex, Qt, QRect
 import pandas as pd
+import numpy as np
+import threading
 from PySide6.QtGui import QAction, QIcon,  QMouseEvent
 
+from . import Columnar
+from .Expression import prepare
+
 # PortfolioTreeView
 # Used to provide the ability to copy/paste cell text
 class PortfolioTreeView(QTreeView):
+    # Number of rows sampled when sizing the columns to their content
+    SAMPLE_ROWS = 200
+
     def __init__(self, parent=None):
         super(PortfolioTreeView, self).__init__(parent)
 
+        self.highThroughput = False
+        self.setGraphicsEffect(self.createShadow())
+
+        self.setStyleSheet("QTreeView::branch { image: none; }") # Remove expanding arrow '>' from column 1
+
+    def createShadow(self):
         shadow = QGraphicsDropShadowEffect()
         shadow.setBlurRadius(20)
-        self.setGraphicsEffect(shadow)
+        return shadow
+
+    # setHighThroughput
+    # Rendering mode tuned for very large, flat results.  A graphics effect on the whole widget
+    # forces the entire viewport to be re-rendered offscreen on every scroll step, so it is
+    # dropped along with per-row height calculations.
+    def setHighThroughput(self, enabled):
+        if enabled == self.highThroughput:
+            return
 
-        self.setStyleSheet("QTreeView::branch { image: none; }") # Remove expanding arrow '>' from column 1
+        self.highThroughput = enabled
+        self.setGraphicsEffect(None if enabled else self.createShadow())
+        self.setUniformRowHeights(enabled)
+
+    # setGrouped
+    # Present the expanding arrows and span the group labels across the columns when grouped
+    def setGrouped(self, grouped):
+        self.setItemsExpandable(grouped)
+        self.setStyleSheet("" if grouped else "QTreeView::branch { image: none; }")
+        self.spanGroups()
+
+    def spanGroups(self):
+        model = self.model()
+        if model is None or model.groupColumn is None:
+            return
+        for row in range(model.rowCount()):
+            self.setFirstColumnSpanned(row, QModelIndex(), True)
+
+    # autoSizeColumns
+    # Size each column to fit its header and a sample of rows spread evenly across the model,
+    # rather than measuring every row as resizeColumnToContents() would.
+    def autoSizeColumns(self, skip=(), maxWidth=400):
+        model = self.model()
+        if model is None:
+            return
+
+        rows = model.rowCount()
+        step = max(1, rows // self.SAMPLE_ROWS)
+        sample = range(0, rows, step)
+        metrics = self.fontMetrics()
+        header_metrics = self.header().fontMetrics()
+        padding = 2 * self.style().pixelMetric(QStyle.PM_HeaderMargin) + 24
+
+        for column in range(model.columnCount()):
+            if column in skip:
+                continue
+            width = header_metrics.horizontalAdvance(str(model.headerData(column, Qt.Horizontal)))
+            for row in sample:
+                text = model.data(model.index(row, column))
+                if text:
+                    width = max(width, metrics.horizontalAdvance(text))
+            self.setColumnWidth(column, min(width + padding, maxWidth))
 
     # Right-click a cell to copy/paste
     def contextMenuEvent(self, event):
@@ -38,13 +101,6 @@ class PortfolioTreeView(QTreeView):
         text = index.data(Qt.DisplayRole)
         QApplication.clipboard().setText(text)
 
-    # The default 'mouseDoubleClickEvent' causes the application to crash
-    # due to the data model and possibly the index() method.  For now, I
-    # can prevent this from happening by implementing the override method
-    # below.
-    def mouseDoubleClickEvent(self, event):
-        return  
-
 # FilterHeaderView
 # Used to providing column filtering
 class FilterHeaderView(QHeaderView):
@@ -71,8 +127,7 @@ class FilterHeaderView(QHeaderView):
         self.icon = self.empty_filter
         self.families = []
         self.selected_filter = None
-        if 'family' in model.df:
-            self.families = model.df['family'].unique()
+        self.families = model.families()
 
     def paintSection(self, painter, rect, logicalIndex):
         painter.save()
@@ -145,32 +200,50 @@ class FilterHeaderView(QHeaderView):
         self.viewport().update()
         
 
+# DataFrameModel
+# The loaded results are held once, in compact columnar form (see Columnar).  Sorted and
+# filtered states are represented by a permutation of row positions rather than copies.
 class DataFrameModel(QAbstractItemModel):
     # Some column names
     EXTENDED_PROPERTIES = 'extendedProperties'
     FAMILY = 'family'
     ACCESSIBILITY = 'accessibility'   
 
-    def __init__(self, df, signal, parent=None):
+    # Name of the search expression filter
+    EXPRESSION = 'expression'
+
+    ROW_FLAGS = Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemNeverHasChildren
+    GROUP_FLAGS = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    # Number of child rows materialized each time an expanded group fetches more
+    FETCH_SIZE = 1000
+
+    # Label of the group holding rows without a value
+    NO_GROUP = '(none)'
+
+    # Steps reported to the (optional) progress object while building the model - in addition
+    # to one for each column compacted
+    BUILD_STEPS = 3
+
+    def __init__(self, df, signal, parent=None, progress=None):
         super(DataFrameModel, self).__init__(parent)
 
         self.sorting = False
         self.signal = signal
 
         # Enhance the data frame to include an 'row count' and 'family'
-        df.insert(0, '     #', range(1, len(df) + 1))
+        df.insert(0, '     #', np.arange(1, len(df) + 1, dtype=np.int32))
+        steps = self.BUILD_STEPS + len(df.columns)
+        self.reportProgress(progress, 1, steps)
 
-        # Check if 'family' column exists in 'result'
+        # Check if 'family' column exists in 'result' - results projected by PAM (see PAM.FIELDS)
+        # already hold 'family' as their first column
         if self.EXTENDED_PROPERTIES in df.columns:
-            properties=df[self.EXTENDED_PROPERTIES].apply(pd.Series)
-            if self.FAMILY in properties.columns:
-                # Insert 'family' column from 'result' into 'df' after the first column
-                df.insert(1, self.FAMILY, properties[self.FAMILY])
-            else:
-                # Insert a column of empty values
-                df.insert(1, self.FAMILY, pd.Series([""] * len(df), dtype='object'))
-
+            # Insert 'family' column from 'result' into 'df' after the first column
+            families = [p.get(self.FAMILY, "") if isinstance(p, dict) else "" for p in df[self.EXTENDED_PROPERTIES]]
+            df.insert(1, self.FAMILY, pd.Series(families, index=df.index, dtype='object'))
             df.drop(self.EXTENDED_PROPERTIES, axis=1, inplace=True)
+        self.reportProgress(progress, 2, steps)
 
         # Update the other columns
         self.rename(df, 'numberOfConstituents', '# constituents')
@@ -181,64 +254,244 @@ class DataFrameModel(QAbstractItemModel):
         if self.ACCESSIBILITY in df:
             df.drop(self.ACCESSIBILITY, axis=1, inplace=True)
 
-        self.df = df
-        self.master_df = df
-        self.indexCache = {}
+        self.master_df = Columnar.compact(df.reset_index(drop=True),
+                                          lambda completed: self.reportProgress(progress, 2 + completed, steps))
+        self.columns = list(self.master_df.columns)
+        self.arrays = [self.master_df[column].array for column in self.columns]
+
+        # 'order' - all row positions in their sorted order
+        # 'masks' - named boolean filters over all rows (i.e. 'family'), with their descriptions
+        # 'rows' - the row positions presented
+        self.order = np.arange(len(self.master_df))
+        self.masks = {}
+        self.filters = {}
+        self.rows = self.order
+
+        # Column conversions re-used when evaluating search expressions and grouping.  The lock
+        # serializes their evaluation (and preparation) within worker threads.
+        self.cache = {}
+        self.cacheLock = threading.Lock()
+
+        # Grouped mode (see setGrouping)
+        self.groupColumn = None
+        self.reportProgress(progress, steps, steps)
 
         # Notify data change
         self.signal.dataChanged.emit(self.statusMsg())
+        self.signal.memoryChanged.emit(*self.memoryReport())
+
+    def reportProgress(self, progress, step, steps):
+        if progress is not None:
+            progress.setModelProgress(step, steps)
 
     def rename(self, df, col_name1, col_name2):
         if col_name1 in df:
             df.rename(columns={col_name1: col_name2}, inplace=True)
 
+    # Index layout
+    # When flat, every row is a top-level item.  When grouped, the top-level items are the
+    # groups and the rows are their children.  The internal id of an index is 0 for top-level
+    # items, otherwise the group number + 1 of its parent.
+    #
+    # Note: Rows never have children.  Reporting rows beneath a row allowed the view to expand
+    # a row into itself (i.e. on a double-click).
+    def isGroup(self, index):
+        return self.groupColumn is not None and index.isValid() and index.internalId() == 0
+
     def rowCount(self, parent=QModelIndex()):
-        return len(self.df)
+        if not parent.isValid():
+            return len(self.groups) if self.groupColumn is not None else len(self.rows)
+        if self.isGroup(parent) and parent.column() == 0:
+            return self.fetched[parent.row()]
+        return 0
 
     def columnCount(self, parent=QModelIndex()):
-        return len(self.df.columns)
+        return len(self.columns)
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return True
+        return self.isGroup(parent) and parent.column() == 0
 
     def index(self, row, column, parent=QModelIndex()):
-        if self.hasIndex(row, column, parent):
-            if (row, column) not in self.indexCache:
-                self.indexCache[(row, column)] = self.createIndex(row, column)
-            return self.indexCache[(row, column)]
-        else:
+        if column < 0 or column >= len(self.columns) or row < 0:
             return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, 0) if row < self.rowCount() else QModelIndex()
+        if self.isGroup(parent) and row < self.fetched[parent.row()]:
+            return self.createIndex(row, column, parent.row() + 1)
+        return QModelIndex()
 
     def parent(self, index):
-        return QModelIndex()
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    # Note: The view queries the flags of every row when laying out, so they are computed once
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return self.GROUP_FLAGS if self.isGroup(index) else self.ROW_FLAGS
+
+    # Children of a group are materialized only once the view asks for them (i.e. expanded)
+    def canFetchMore(self, parent):
+        return self.isGroup(parent) and self.fetched[parent.row()] < self.counts[parent.row()]
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+
+        group = parent.row()
+        if group not in self.children:
+            self.children[group] = self.rows[self.rowGroups == self.groups[group]]
+
+        first = self.fetched[group]
+        last = min(first + self.FETCH_SIZE, self.counts[group]) - 1
+        self.beginInsertRows(parent, first, last)
+        self.fetched[group] = last + 1
+        self.endInsertRows()
 
     def data(self, index, role=Qt.DisplayRole):
         if index.isValid():
             if role == Qt.DisplayRole:
-                return str(self.df.iloc[index.row(), index.column()])
+                group = index.internalId()
+                if self.groupColumn is None:
+                    position = self.rows[index.row()]
+                elif group == 0:
+                    if index.column() != 0:
+                        return ""
+                    return f'{self.labels[self.groups[index.row()]]} ({self.counts[index.row()]:,})'
+                else:
+                    position = self.children[group - 1][index.row()]
+
+                value = self.arrays[index.column()][position]
+                return "" if pd.isna(value) else str(value)
         return None
 
     def headerData(self, section, orientation, role=Qt.DisplayRole):
         if orientation == Qt.Horizontal and role == Qt.DisplayRole:
-            return self.df.columns[section]
+            return self.columns[section]
         return None
     
     def sort(self, column, order):      
         if self.sorting:
-            self.layoutAboutToBeChanged.emit()
-            self.df = self.df.sort_values(self.df.columns[column], ascending=order == Qt.AscendingOrder)
-            self.layoutChanged.emit()
+            self.order = self.arrays[column].argsort(ascending=order == Qt.AscendingOrder, kind='stable')
+            self.refresh()
 
         self.sorting = True
 
-    def statusMsg(self, family=None):
-        msg = f"Found a total of {len(self.df)} portfolios"
-        if family is not None:
-            msg = f'{msg} based on the filter: {family}'
+    # Present the current sort order and filters.  In grouped mode, the groups are rebuilt.
+    def refresh(self):
+        if self.groupColumn is None:
+            self.layoutAboutToBeChanged.emit()
+            self.updateRows()
+            self.layoutChanged.emit()
+        else:
+            self.beginResetModel()
+            self.updateRows()
+            self.updateGroups()
+            self.endResetModel()
+
+    # setGrouping
+    # Group the rows by the values of the specified column (None to present the rows flat)
+    def setGrouping(self, column):
+        if column is not None and column not in self.master_df:
+            column = None
+
+        self.beginResetModel()
+        self.groupColumn = column
+        if column is not None:
+            self.updateGroups()
+        self.endResetModel()
+        return column
+
+    # Group the presented rows - only the counts are computed here, vectorized.  The rows of a
+    # group are materialized when the group is expanded (see fetchMore).
+    def updateGroups(self):
+        keys, self.labels = self.groupKeys(self.groupColumn)
+        self.rowGroups = keys[self.rows]
+        counts = np.bincount(self.rowGroups, minlength=len(self.labels))
+
+        # Sorted by label, rows without a value last
+        order = list(range(1, len(self.labels))) + [0]
+        self.groups = [group for group in order if counts[group] > 0]
+        self.counts = [int(counts[group]) for group in self.groups]
+        self.fetched = [0] * len(self.groups)
+        self.children = {}
+
+    # The group of every row along with the group labels.  Group 0 holds the rows without a
+    # value (missing or empty).
+    def groupKeys(self, column):
+        key = (column, 'groups')
+        if key not in self.cache:
+            codes, uniques = pd.factorize(self.master_df[column], sort=True)
+            labels = [self.NO_GROUP] + [str(value) for value in uniques]
+            lookup = np.array([0] + [group if labels[group] else 0 for group in range(1, len(labels))])
+            self.cache[key] = (lookup[codes + 1], labels)
+        return self.cache[key]
+
+    # The distinct, non-empty families available for filtering
+    def families(self):
+        if self.FAMILY not in self.master_df:
+            return []
+        return [family for family in self.master_df[self.FAMILY].dropna().unique() if family]
+
+    def statusMsg(self):
+        msg = f"Found a total of {len(self.rows)} portfolios"
+        if self.FAMILY in self.filters:
+            msg = f'{msg} based on the filter: {self.filters[self.FAMILY]}'
+        if self.EXPRESSION in self.filters:
+            msg = f'{msg} matching: {self.filters[self.EXPRESSION]}'
         return msg
 
-    def apply_filter(self, family):
-        self.df = self.master_df if family is None else self.master_df[self.master_df[self.FAMILY] == family]
+    # Bytes held by the model, in total and per column
+    def memoryReport(self):
+        usage = Columnar.memory_usage(self.master_df)
+        total = Columnar.format_bytes(usage.sum() + self.order.nbytes + self.rows.nbytes)
+        columns = [f'{column.strip()}: {Columnar.format_bytes(count)}' for column, count in usage.items()]
+        largest = ", ".join(columns[:3]) + (", ..." if len(columns) > 3 else "")
+        return f'Memory: {total} ({largest})', "\n".join(columns)
+
+    # Present the rows, in sorted order, that satisfy every filter
+    def updateRows(self):
+        if not self.masks:
+            self.rows = self.order
+            return
+
+        mask = None
+        for m in self.masks.values():
+            mask = m if mask is None else mask & m
+        self.rows = self.order[mask[self.order]]
+
+    def setMask(self, name, mask, description=None):
+        if mask is None:
+            self.masks.pop(name, None)
+            self.filters.pop(name, None)
+        else:
+            self.masks[name] = mask
+            self.filters[name] = description
 
         # Notify the view that the data has changed
-        self.layoutChanged.emit()
+        self.refresh()
 
         # Signal status details of new filtered data
-        self.signal.dataChanged.emit(self.statusMsg(family))
\ No newline at end of file
+        self.signal.dataChanged.emit(self.statusMsg())
+
+    def apply_filter(self, family):
+        mask = None if family is None else (self.master_df[self.FAMILY] == family).to_numpy()
+        self.setMask(self.FAMILY, mask, family)
+
+    # Evaluate the compiled search expression over all rows.  Reads the data only, so may be
+    # called from a worker thread.
+    def evaluate(self, expression):
+        with self.cacheLock:
+            return expression.evaluate(self.master_df, self.cache)
+
+    # Prepare the conversions used by search expressions (see Expression.prepare) - within a
+    # worker thread once the results are presented.
+    def prepareExpressions(self):
+        with self.cacheLock:
+            prepare(self.master_df, self.cache)
+
+    def apply_expression(self, expression, mask):
+        self.setMask(self.EXPRESSION, mask, None if expression is None else expression.text)
@@ -1,5 +1,7 @@
 from .app import Window
 from .Frames import DataFrame, StatusFrame, InputFrame
 from .PAM import PAM
+from . import Columnar
 from .TreeComponents import PortfolioTreeView, DataFrameModel
-from .waitingspinnerwidget import QtWaitingSpinner
\ No newline at end of file
+from .waitingspinnerwidget import QtWaitingSpinner
+from .ProgressOverlay import ProgressOverlay
@@ -6,13 +6,15 @@
 import refinitiv.data as rd
 
 from PySide6.QtWidgets import QMainWindow, QVBoxLayout, QWidget
-from PySide6.QtGui import QIcon
+from PySide6.QtGui import QIcon, QKeySequence, QShortcut
 
 from .PAM import PAM
 from .Frames import DataFrame, InputFrame, StatusFrame
-from .waitingspinnerwidget import QtWaitingSpinner
+from .ProgressOverlay import ProgressOverlay
+from .Diagnostics import LoopLagMonitor, SamplingProfiler
+from .SavedSearches import SavedSearches
 
-import traceback, os
+import traceback, os, asyncio
 
 # Window
 # root display window and controller class
@@ -28,8 +30,10 @@ class Window(QMainWindow):
         self.setMinimumSize(400, 200)
 
         self.pam = PAM(self)
+        self.saved = SavedSearches(self)
         self.err = None
         self.session = None
+        self.task = None
 
         # Define the layout within our main container.
         layout = QVBoxLayout()
@@ -54,29 +58,49 @@ class Window(QMainWindow):
 
         # Register interest in grid changes
         self.data.gridChanged.dataChanged.connect(self.setStatusMsg)
+        self.data.gridChanged.memoryChanged.connect(self.status.set_memory)
+        self.data.gridChanged.error.connect(lambda message: self.setStatusMsg(message, True))
+        self.status.metrics = self.pam.scheduler.metrics
+
+        # Request progress feedback, presented over the results grid
+        self.progress = ProgressOverlay(self.data)
+        self.progress.cancelled.connect(self.cancelRequest)
+
+        # Diagnostics - report event loop stalls and, on demand (Ctrl+Shift+P), profile the UI thread
+        self.monitor = LoopLagMonitor(loop, on_stall=lambda stall, path: self.loop.call_soon_threadsafe(
+                                      self.setStatusMsg, f'UI stalled for {int(stall["duration"] * 1000)} ms - details written to: {os.path.abspath(path)}'))
+        self.monitor.start()
+        self.profiler = None
+        self.profileSeconds = 10
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self).activated.connect(lambda: self.startProfiler(self.profileSeconds))
 
     # initialize
     # Upon startup, this method attempts to connect and load an initial list of user-defined portfolios
     def initialize(self):
         self.input.on_submit()
+        self.saved.start()
 
     def check_event(self, event, message, session):
         if event == rd.session.EventCode.SessionAuthenticationFailed:
             self.err = f"Session authentication failed: {message} Refer to the refinitiv-data.config.json config for setting credentials."
 
+    # Note: the session is only assigned once opened.  A cancelled connect may still complete
+    # in the background, in which case the next request simply re-uses the session.
     def open_session(self):
-        self.session = rd.session.Definition().get_session()
-        self.session.on_event(self.check_event)
-        self.session.open()		# Note: open_async blocks for some reason, so I'm using open()
+        session = rd.session.Definition().get_session()
+        session.on_event(self.check_event)
+        session.open()		# Note: open_async blocks for some reason, so I'm using open()
+        if self.err is None:
+            rd.session.set_default(session)
+            self.session = session
 
     async def connect(self):
         # Ensure we can connect into our data environment
         try:
             self.setStatusMsg("Connecting...")			
+            self.progress.setStage("Connecting...")
             await self.loop.run_in_executor(None, self.open_session)
-            if self.err is None:
-                rd.session.set_default(self.session)
-            else:
+            if self.err is not None:
                 self.setStatusMsg(self.err, True)
 
             return self.err is None
@@ -84,6 +108,10 @@ class Window(QMainWindow):
             self.setStatusMsg(f"Failed to connect. {e}", True)
             pass
 
+    # Requests can be served, either by our own session or the local catalog daemon
+    def isConnected(self):
+        return self.session is not None or self.pam.viaDaemon
+
     # set the message in the bottom status bar
     def setStatusMsg(self, message, error=False):
         self.status.set_status(message, error)
@@ -101,22 +129,26 @@ class Window(QMainWindow):
         self.input.setSubmitState(False)
 
         # Provide some user feedback
-        spinner = QtWaitingSpinner(self)
-        spinner.start()
-
-        # Connect, if not already
-        if self.session is None:
-            if not await self.connect():
-                spinner.stop()
-                return
-            
-        # Retrieve the data...
-        ptype = self.mapTypeToPortfolioTypes(typeIndex)
+        self.task = asyncio.current_task()
+        self.progress.start()
 
         try:
+            # Connect, if not already - unless served by the local catalog daemon
+            if self.session is None and not await self.pam.daemonAvailable():
+                if not await self.connect():
+                    return
+                self.progress.setStage("Connected")
+
+            # Retrieve the data...
+            ptype = self.mapTypeToPortfolioTypes(typeIndex)
+
             self.setStatusMsg("Submitted request...")
-            df = await self.pam.requestPortfolios(ptype, query, maxCount)
-            self.data.displayPortfolios(df)
+            self.progress.setStage("Submitted request...")
+            df = await self.pam.requestPortfolios(ptype, query, maxCount, self.progress)
+            self.progress.setStage("Building grid...")
+            self.data.displayPortfolios(df, self.progress)
+        except asyncio.CancelledError:
+            self.setStatusMsg("Request cancelled")
         except Exception as e:
             tb = traceback.TracebackException.from_exception(e)
             err = f'Exception {type(e).__name__} - {e}'
@@ -129,4 +161,25 @@ class Window(QMainWindow):
         finally:
             # Enable submit button
             self.input.setSubmitState(True)
-            spinner.stop()
\ No newline at end of file
+            self.progress.stop()
+            self.task = None
+
+    # startProfiler
+    # Sample the UI thread for the number of seconds specified, writing a flame graph ready profile
+    def startProfiler(self, seconds):
+        if self.profiler is not None and self.profiler.isRunning():
+            return
+
+        self.profiler = SamplingProfiler(seconds, on_done=lambda path, samples: self.loop.call_soon_threadsafe(
+                                         self.setStatusMsg, f'Profile of {samples} samples written to: {os.path.abspath(path)}'))
+        self.profiler.start()
+        self.setStatusMsg(f'Profiling for {seconds} seconds...')
+
+    # A background refresh of a saved search found its results changed
+    def savedSearchChanged(self, search, count):
+        self.setStatusMsg(f"Saved search '{search.name}' has changed - now {count} portfolios (see Saved)")
+
+    # Cancel the outstanding request, if any
+    def cancelRequest(self):
+        if self.task is not None:
+            self.task.cancel()
@@ -0,0 +1,5 @@
+import os, sys
+
+# The tests import the 'finder' package from the application directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
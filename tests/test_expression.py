@@ -0,0 +1,97 @@
+#=============================================================================
+#   This source code is provided under the Apache 2.0 license
+#   and is provided AS IS with no warranty or guarantee of fit for purpose.
+#   Copyright (C) 2024 LSEG. All rights reserved.
+#=============================================================================
+
+# Tests of the search expressions (see finder/Expression.py)
+#
+#   > python -m pytest tests
+
+import random
+import numpy as np
+import pandas as pd
+import pytest
+
+from finder.Expression import compile_expression, contains_mask, find_rows, ExpressionError, pa
+
+ALPHABET = 'abcXYZ msci é日本😀-'
+
+def random_values(rows, seed):
+    rnd = random.Random(seed)
+    return [None if rnd.random() < 0.05 else ''.join(rnd.choice(ALPHABET) for i in range(rnd.randint(0, 12)))
+            for row in range(rows)]
+
+def expected_contains(values, needle):
+    return np.array([value is not None and needle in value.lower() for value in values])
+
+# find_rows - against a brute force search, including needles of every word width, multi-byte
+# characters and matches that would span two rows
+@pytest.mark.skipif(pa is None, reason='requires pyarrow')
+@pytest.mark.parametrize('dtype', [pd.StringDtype('pyarrow'), object])
+def test_contains_matches_brute_force(dtype):
+    for seed in range(3):
+        values = random_values(5000, seed)
+        df = pd.DataFrame({'name': pd.Series(values, dtype=dtype)})
+        cache = {}
+        for needle in ['a', 'xy', 'msc', 'msci', 'ci é', 'é', '日本', '😀', '😀-a', 'zz', 'c x', 'abcabcabc']:
+            assert (contains_mask(df, cache, 'name', needle) == expected_contains(values, needle)).all(), needle
+
+@pytest.mark.skipif(pa is None, reason='requires pyarrow')
+def test_contains_sliced_column():
+    values = random_values(3000, 7)
+    series = pd.Series(values, dtype=pd.StringDtype('pyarrow')).iloc[1000:2000].reset_index(drop=True)
+    mask = contains_mask(pd.DataFrame({'name': series}), {}, 'name', 'ab')
+    assert (mask == expected_contains(values[1000:2000], 'ab')).all()
+
+def test_find_rows_edges():
+    offsets = np.array([0, 2, 4, 4], dtype=np.int64)
+    data = np.frombuffer(b'abcd', dtype=np.uint8)
+    assert find_rows(data, offsets, b'bc').tolist() == [False, False, False]    # Spans two rows
+    assert find_rows(data, offsets, b'cd').tolist() == [False, True, False]
+    assert find_rows(data, offsets, b'abcde').tolist() == [False, False, False]
+    assert find_rows(data, offsets, b'').tolist() == [True, True, True]
+    assert find_rows(np.zeros(0, dtype=np.uint8), np.zeros(1, dtype=np.int64), b'a').tolist() == []
+
+# Parser
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'name': pd.Series(['MSCI World', 'FTSE 100', 'MSCI Europe', None]),
+        'code': ['.MIWO', '.FTSE', '.MIEU', '.NONE'],
+        'family': pd.Series(['Equity', 'Equity', 'Fixed Income', '']).astype('category'),
+        '# constituents': [1500, 100, 430, 0],
+        'modified date': pd.Series(['2025-01-01T00:00:00Z', '2025-01-01T23:59:59Z', '2025-01-02T00:00:00Z', None],
+                                   dtype=object).astype('category'),
+    })
+
+def rows(df, text):
+    return np.flatnonzero(compile_expression(text, df).evaluate(df)).tolist()
+
+@pytest.mark.parametrize('text', ['(a', 'a)', 'name:', 'AND', 'unknown:x', 'constituents>many', 'modified>someday', '"a'])
+def test_invalid_expressions(df, text):
+    with pytest.raises(ExpressionError):
+        compile_expression(text, df)
+
+def test_terms(df):
+    assert rows(df, 'msci') == [0, 2]
+    assert rows(df, 'name:~msci AND family:equity') == [0]
+    assert rows(df, 'msci family:equity') == [0]                        # Implicit AND
+    assert rows(df, 'ftse OR constituents<=0') == [1, 3]
+    assert rows(df, 'NOT (msci OR ftse)') == [3]
+    assert rows(df, 'name:"msci world"') == [0]
+    assert rows(df, 'family!=equity') == [2, 3]
+    assert rows(df, 'constituents>=430 constituents<1500') == [2]
+
+def test_date_day_semantics(df):
+    # A date without a time covers the whole day
+    assert rows(df, 'modified=2025-01-01') == [0, 1]
+    assert rows(df, 'modified:2025-01-01') == [0, 1]
+    assert rows(df, 'modified!=2025-01-01') == [2, 3]
+    assert rows(df, 'modified>2025-01-01') == [2]
+    assert rows(df, 'modified>=2025-01-01') == [0, 1, 2]
+    assert rows(df, 'modified<2025-01-02') == [0, 1]
+    assert rows(df, 'modified<=2025-01-01') == [0, 1]
+
+    # With a time (quoted, as it holds ':'), the comparison is exact
+    assert rows(df, 'modified>"2025-01-01T12:00:00Z"') == [1, 2]